@@ -31,6 +31,7 @@ from backend.services.task_service_db import TaskServiceDB
 from backend.services.template_service import TemplateService
 from backend.services.settings_service import SettingsService
 from backend.services.project_service import ProjectService
+from backend.services.notification_service import close_notification_service
 from typing import List
 import asyncio
 from datetime import datetime
@@ -147,6 +148,14 @@ async def shutdown_event():
             except Exception as e:
                 print(f"⚠️ 停止会话看门狗失败: {e}")
 
+            # 等待进行中的回调通知完成，再关闭通知服务共享的 HTTP 连接池
+            try:
+                await task_service.flush_notifications()
+                await close_notification_service()
+                print("✅ 服务关闭：已关闭通知服务连接池")
+            except Exception as e:
+                print(f"⚠️ 关闭通知服务连接池失败: {e}")
+
             # 优化6.3: 关闭共享数据库连接池（只需关闭一次）
             try:
                 await close_shared_database()
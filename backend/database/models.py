@@ -5,23 +5,25 @@ import aiosqlite
 import asyncio
 import uuid
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Sequence
 from contextlib import asynccontextmanager
 
 
 class AsyncConnectionPool:
     """异步连接池管理器 - 支持跨事件循环使用"""
 
-    def __init__(self, db_path: str, pool_size: int = 5):
+    def __init__(self, db_path: str, pool_size: int = 5, pragmas: Sequence[str] = ()):
         """
         初始化连接池
 
         Args:
             db_path: 数据库文件路径
             pool_size: 连接池大小
+            pragmas: 每个连接额外执行的 PRAGMA（如 "synchronous=OFF"）
         """
         self.db_path = db_path
         self.pool_size = pool_size
+        self.pragmas = tuple(pragmas)
         self._pool: Optional[asyncio.Queue] = None
         self._initialized = False
         self._lock = None  # 延迟初始化
@@ -47,6 +49,10 @@ class AsyncConnectionPool:
                 conn.row_factory = aiosqlite.Row
                 # 启用 WAL 模式，提升并发性能
                 await conn.execute("PRAGMA journal_mode=WAL")
+                # WAL 模式下 NORMAL 同步级别是安全的，可减少每次提交的 fsync
+                await conn.execute("PRAGMA synchronous=NORMAL")
+                for pragma in self.pragmas:
+                    await conn.execute(f"PRAGMA {pragma}")
                 await conn.commit()
                 await self._pool.put(conn)
                 self._connections.append(conn)
@@ -96,9 +102,9 @@ class AsyncConnectionPool:
 class Database:
     """SQLite 异步数据库连接管理器"""
 
-    def __init__(self, db_path: str = "aitaskrunner.db", pool_size: int = 5):
+    def __init__(self, db_path: str = "aitaskrunner.db", pool_size: int = 5, pragmas: Sequence[str] = ()):
         self.db_path = db_path
-        self._pool = AsyncConnectionPool(db_path, pool_size)
+        self._pool = AsyncConnectionPool(db_path, pool_size, pragmas)
         self._init_task = None
         self._init_lock = None
 
@@ -244,6 +250,13 @@ class Database:
                 ON prompt_templates(type)
             """)
 
+            # 部分索引：直接服务于"按类型查询默认模板"
+            await cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_prompt_templates_type_default
+                ON prompt_templates(type, is_default)
+                WHERE is_default = 1
+            """)
+
             await cursor.execute("""
                 CREATE INDEX IF NOT EXISTS idx_projects_directory
                 ON projects(directory_path)
@@ -357,32 +370,81 @@ class TaskDAO:
             rows = await cursor.fetchall()
             return [dict(row) for row in rows]
 
+    @staticmethod
+    def _build_update_query(task_id: str, updates: Dict[str, Any]) -> Optional[tuple]:
+        """构建 UPDATE 语句，没有可更新字段时返回 None"""
+        set_clauses = []
+        values = []
+
+        allowed_fields = ['project_directory', 'markdown_document_path', 'status', 'cli_type', 'callback_url', 'completed_at', 'enable_review']
+
+        for field in allowed_fields:
+            if field in updates:
+                set_clauses.append(f"{field} = ?")
+                values.append(updates[field])
+
+        if not set_clauses:
+            return None
+
+        set_clauses.append("updated_at = ?")
+        values.append(datetime.now().isoformat())
+        values.append(task_id)
+
+        return f"UPDATE tasks SET {', '.join(set_clauses)} WHERE id = ?", values
+
     async def update_task(self, task_id: str, updates: Dict[str, Any]) -> bool:
         """更新任务"""
+        update_query = self._build_update_query(task_id, updates)
+        if update_query is None:
+            return False
+
         async with self.db.get_connection() as conn:
             cursor = await conn.cursor()
+            await cursor.execute(*update_query)
+            return cursor.rowcount > 0
 
-            set_clauses = []
-            values = []
-
-            allowed_fields = ['project_directory', 'markdown_document_path', 'status', 'cli_type', 'callback_url', 'completed_at', 'enable_review']
+    async def update_task_returning(
+        self,
+        task_id: str,
+        updates: Dict[str, Any],
+        log_entry: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        在同一个事务中更新任务、写入日志并返回更新后的任务（不含日志）
 
-            for field in allowed_fields:
-                if field in updates:
-                    set_clauses.append(f"{field} = ?")
-                    values.append(updates[field])
+        Args:
+            task_id: 任务ID
+            updates: 要更新的字段
+            log_entry: 可选日志，包含 level 和 message
 
-            if not set_clauses:
-                return False
+        Returns:
+            更新后的任务字典，任务不存在或没有可更新字段时返回 None
+        """
+        update_query = self._build_update_query(task_id, updates)
+        if update_query is None:
+            return None
 
-            set_clauses.append("updated_at = ?")
-            values.append(datetime.now().isoformat())
-            values.append(task_id)
+        async with self.db.get_connection() as conn:
+            cursor = await conn.cursor()
+            await cursor.execute(*update_query)
+            if cursor.rowcount <= 0:
+                return None
 
-            query = f"UPDATE tasks SET {', '.join(set_clauses)} WHERE id = ?"
-            await cursor.execute(query, values)
+            if log_entry is not None:
+                await cursor.execute("""
+                    INSERT INTO task_logs (
+                        task_id, timestamp, level, message
+                    ) VALUES (?, ?, ?, ?)
+                """, (
+                    task_id,
+                    datetime.now().isoformat(),
+                    log_entry['level'],
+                    log_entry['message']
+                ))
 
-            return cursor.rowcount > 0
+            await cursor.execute("SELECT * FROM tasks WHERE id = ?", (task_id,))
+            row = await cursor.fetchone()
+            return dict(row) if row else None
 
     async def delete_task(self, task_id: str) -> bool:
         """删除任务"""
@@ -461,41 +523,132 @@ class TaskDAO:
 class TemplateDAO:
     """Data Access Object for prompt templates - 异步版本"""
 
+    # 与 _template_insert_values 返回值顺序一致的列名
+    _TEMPLATE_INSERT_COLUMNS = (
+        'id', 'name', 'type', 'content', 'content_en', 'description', 'is_default',
+        'created_at', 'updated_at'
+    )
+
+    # 高频 SQL 语句定义为类常量：sqlite3 按 SQL 文本缓存每个连接上已编译的语句，
+    # 固定的文本保证池中每个连接只解析一次
+    _SQL_INSERT = """
+        INSERT INTO prompt_templates (
+            id, name, type, content, content_en, description, is_default,
+            created_at, updated_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    _SQL_GET_BY_ID = "SELECT * FROM prompt_templates WHERE id = ?"
+    _SQL_GET_TYPE_BY_ID = "SELECT type FROM prompt_templates WHERE id = ?"
+    _SQL_GET_BY_TYPE_DEFAULT = """
+        SELECT * FROM prompt_templates
+        WHERE type = ? AND is_default = 1
+        LIMIT 1
+    """
+    _SQL_GET_BY_TYPE_LATEST = """
+        SELECT * FROM prompt_templates
+        WHERE type = ?
+        ORDER BY updated_at DESC
+        LIMIT 1
+    """
+    _SQL_GET_ALL = "SELECT * FROM prompt_templates ORDER BY type, name"
+    _SQL_GET_ALL_BY_TYPE = """
+        SELECT * FROM prompt_templates
+        WHERE type = ?
+        ORDER BY is_default DESC, name
+    """
+    _SQL_CLEAR_DEFAULTS = """
+        UPDATE prompt_templates
+        SET is_default = 0, updated_at = ?
+        WHERE type = ? AND is_default = 1
+    """
+    _SQL_CLEAR_DEFAULTS_EXCEPT = """
+        UPDATE prompt_templates
+        SET is_default = 0, updated_at = ?
+        WHERE type = ? AND is_default = 1 AND id != ?
+          AND EXISTS (SELECT 1 FROM prompt_templates WHERE id = ?)
+    """
+    _SQL_CLEAR_TYPE_DEFAULT = """
+        UPDATE prompt_templates
+        SET is_default = 0
+        WHERE type = ?
+    """
+    _SQL_SET_DEFAULT = """
+        UPDATE prompt_templates
+        SET is_default = 1, updated_at = ?
+        WHERE id = ?
+    """
+    _SQL_DELETE = "DELETE FROM prompt_templates WHERE id = ?"
+
     def __init__(self, db: Database):
         self.db = db
 
+    @staticmethod
+    def _template_insert_values(template_data: Dict[str, Any], now: str) -> tuple:
+        """构建模板 INSERT 语句的参数"""
+        return (
+            template_data.get('id', f"tpl_{uuid.uuid4().hex[:12]}"),
+            template_data['name'],
+            template_data['type'],
+            template_data['content'],
+            template_data.get('content_en'),
+            template_data.get('description', ''),
+            template_data.get('is_default', 0),
+            now,
+            now
+        )
+
     async def create_template(self, template_data: Dict[str, Any]) -> str:
         """创建新模板"""
         async with self.db.get_connection() as conn:
             cursor = await conn.cursor()
 
+            values = self._template_insert_values(template_data, datetime.now().isoformat())
+
+            await cursor.execute(self._SQL_INSERT, values)
+
+            return values[0]
+
+    async def create_template_returning(self, template_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        创建新模板并返回插入的行
+
+        插入的各列值在本地构建，直接组装为行字典，无需再 SELECT 一次
+        （不使用 RETURNING，以兼容 3.35 之前的 SQLite）
+        """
+        values = self._template_insert_values(template_data, datetime.now().isoformat())
+
+        async with self.db.get_connection() as conn:
+            cursor = await conn.cursor()
+            await cursor.execute(self._SQL_INSERT, values)
+
+        return dict(zip(self._TEMPLATE_INSERT_COLUMNS, values))
+
+    async def create_templates_bulk(self, templates: List[Dict[str, Any]]) -> int:
+        """
+        在同一个事务中批量创建模板
+
+        Args:
+            templates: 模板数据列表
+
+        Returns:
+            创建的模板数量
+        """
+        if not templates:
+            return 0
+
+        async with self.db.get_connection() as conn:
+            cursor = await conn.cursor()
             now = datetime.now().isoformat()
-            template_id = template_data.get('id', f"tpl_{uuid.uuid4().hex[:12]}")
 
-            await cursor.execute("""
-                INSERT INTO prompt_templates (
-                    id, name, type, content, content_en, description, is_default,
-                    created_at, updated_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                template_id,
-                template_data['name'],
-                template_data['type'],
-                template_data['content'],
-                template_data.get('content_en'),
-                template_data.get('description', ''),
-                template_data.get('is_default', 0),
-                now,
-                now
-            ))
+            await cursor.executemany(self._SQL_INSERT, [self._template_insert_values(tpl, now) for tpl in templates])
 
-            return template_id
+            return len(templates)
 
     async def get_template(self, template_id: str) -> Optional[Dict[str, Any]]:
         """根据ID获取模板"""
         async with self.db.get_connection() as conn:
             cursor = await conn.cursor()
-            await cursor.execute("SELECT * FROM prompt_templates WHERE id = ?", (template_id,))
+            await cursor.execute(self._SQL_GET_BY_ID, (template_id,))
             row = await cursor.fetchone()
             return dict(row) if row else None
 
@@ -504,26 +657,32 @@ class TemplateDAO:
         async with self.db.get_connection() as conn:
             cursor = await conn.cursor()
             if use_default:
-                await cursor.execute("""
-                    SELECT * FROM prompt_templates
-                    WHERE type = ? AND is_default = 1
-                    LIMIT 1
-                """, (template_type,))
+                await cursor.execute(self._SQL_GET_BY_TYPE_DEFAULT, (template_type,))
             else:
-                await cursor.execute("""
-                    SELECT * FROM prompt_templates
-                    WHERE type = ?
-                    ORDER BY updated_at DESC
-                    LIMIT 1
-                """, (template_type,))
+                await cursor.execute(self._SQL_GET_BY_TYPE_LATEST, (template_type,))
             row = await cursor.fetchone()
             return dict(row) if row else None
 
+    async def get_default_templates_by_types(self, template_types: Sequence[str]) -> List[Dict[str, Any]]:
+        """一次查询获取多个类型的默认模板"""
+        if not template_types:
+            return []
+
+        placeholders = ", ".join("?" * len(template_types))
+        async with self.db.get_connection() as conn:
+            cursor = await conn.cursor()
+            await cursor.execute(
+                f"SELECT * FROM prompt_templates WHERE type IN ({placeholders}) AND is_default = 1",
+                tuple(template_types)
+            )
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
+
     async def get_all_templates(self) -> List[Dict[str, Any]]:
         """获取所有模板"""
         async with self.db.get_connection() as conn:
             cursor = await conn.cursor()
-            await cursor.execute("SELECT * FROM prompt_templates ORDER BY type, name")
+            await cursor.execute(self._SQL_GET_ALL)
             rows = await cursor.fetchall()
             return [dict(row) for row in rows]
 
@@ -531,46 +690,91 @@ class TemplateDAO:
         """获取指定类型的所有模板"""
         async with self.db.get_connection() as conn:
             cursor = await conn.cursor()
-            await cursor.execute("""
-                SELECT * FROM prompt_templates
-                WHERE type = ?
-                ORDER BY is_default DESC, name
-            """, (template_type,))
+            await cursor.execute(self._SQL_GET_ALL_BY_TYPE, (template_type,))
             rows = await cursor.fetchall()
             return [dict(row) for row in rows]
 
+    @staticmethod
+    def _build_update_query(template_id: str, updates: Dict[str, Any]) -> Optional[tuple]:
+        """构建 UPDATE 语句，没有可更新字段时返回 None"""
+        set_clauses = []
+        values = []
+
+        allowed_fields = ['name', 'type', 'content', 'content_en', 'description', 'is_default']
+
+        for field in allowed_fields:
+            if field in updates:
+                set_clauses.append(f"{field} = ?")
+                values.append(updates[field])
+
+        if not set_clauses:
+            return None
+
+        set_clauses.append("updated_at = ?")
+        values.append(datetime.now().isoformat())
+        values.append(template_id)
+
+        return f"UPDATE prompt_templates SET {', '.join(set_clauses)} WHERE id = ?", values
+
     async def update_template(self, template_id: str, updates: Dict[str, Any]) -> bool:
         """更新模板"""
+        update_query = self._build_update_query(template_id, updates)
+        if update_query is None:
+            return False
+
         async with self.db.get_connection() as conn:
             cursor = await conn.cursor()
+            await cursor.execute(*update_query)
+            return cursor.rowcount > 0
 
-            set_clauses = []
-            values = []
+    async def update_template_returning(self, template_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        在同一个连接上更新模板并返回更新后的行
 
-            allowed_fields = ['name', 'type', 'content', 'content_en', 'description', 'is_default']
+        Returns:
+            更新后的模板字典，模板不存在或没有可更新字段时返回 None
+        """
+        update_query = self._build_update_query(template_id, updates)
+        if update_query is None:
+            return None
 
-            for field in allowed_fields:
-                if field in updates:
-                    set_clauses.append(f"{field} = ?")
-                    values.append(updates[field])
+        async with self.db.get_connection() as conn:
+            cursor = await conn.cursor()
+            await cursor.execute(*update_query)
+            if cursor.rowcount <= 0:
+                return None
 
-            if not set_clauses:
-                return False
+            await cursor.execute(self._SQL_GET_BY_ID, (template_id,))
+            row = await cursor.fetchone()
+            return dict(row) if row else None
 
-            set_clauses.append("updated_at = ?")
-            values.append(datetime.now().isoformat())
-            values.append(template_id)
+    async def clear_defaults_for_type(self, tpl_type: str, except_id: Optional[str] = None) -> int:
+        """
+        用一条 UPDATE 清除指定类型的默认模板标记
 
-            query = f"UPDATE prompt_templates SET {', '.join(set_clauses)} WHERE id = ?"
-            await cursor.execute(query, values)
+        Args:
+            tpl_type: 模板类型
+            except_id: 保留默认标记的模板ID（可选，该模板不存在时不做任何修改）
 
-            return cursor.rowcount > 0
+        Returns:
+            被清除默认标记的模板数量
+        """
+        async with self.db.get_connection() as conn:
+            cursor = await conn.cursor()
+            if except_id is None:
+                await cursor.execute(self._SQL_CLEAR_DEFAULTS, (datetime.now().isoformat(), tpl_type))
+            else:
+                await cursor.execute(
+                    self._SQL_CLEAR_DEFAULTS_EXCEPT,
+                    (datetime.now().isoformat(), tpl_type, except_id, except_id)
+                )
+            return cursor.rowcount
 
     async def delete_template(self, template_id: str) -> bool:
         """删除模板"""
         async with self.db.get_connection() as conn:
             cursor = await conn.cursor()
-            await cursor.execute("DELETE FROM prompt_templates WHERE id = ?", (template_id,))
+            await cursor.execute(self._SQL_DELETE, (template_id,))
             return cursor.rowcount > 0
 
     async def set_default_template(self, template_id: str) -> bool:
@@ -579,7 +783,7 @@ class TemplateDAO:
             cursor = await conn.cursor()
 
             # 获取模板类型
-            await cursor.execute("SELECT type FROM prompt_templates WHERE id = ?", (template_id,))
+            await cursor.execute(self._SQL_GET_TYPE_BY_ID, (template_id,))
             row = await cursor.fetchone()
             if not row:
                 return False
@@ -587,18 +791,10 @@ class TemplateDAO:
             template_type = row['type']
 
             # 清除同类型的其他默认设置
-            await cursor.execute("""
-                UPDATE prompt_templates
-                SET is_default = 0
-                WHERE type = ?
-            """, (template_type,))
+            await cursor.execute(self._SQL_CLEAR_TYPE_DEFAULT, (template_type,))
 
             # 设置当前项为默认
-            await cursor.execute("""
-                UPDATE prompt_templates
-                SET is_default = 1, updated_at = ?
-                WHERE id = ?
-            """, (datetime.now().isoformat(), template_id))
+            await cursor.execute(self._SQL_SET_DEFAULT, (datetime.now().isoformat(), template_id))
 
             return cursor.rowcount > 0
 
@@ -11,16 +11,43 @@ from backend.models.schemas import TaskNotificationPayload
 class NotificationService:
     """任务通知服务"""
 
-    def __init__(self, timeout: int = 30, max_retries: int = 3):
+    # 连接池中保持的最大空闲连接数
+    MAX_KEEPALIVE_CONNECTIONS = 20
+
+    def __init__(
+        self,
+        timeout: int = 30,
+        max_retries: int = 3,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
         """
         初始化通知服务
 
         Args:
             timeout: HTTP请求超时时间（秒）
             max_retries: 最大重试次数
+            transport: 自定义 HTTP 传输层（如测试用的 httpx.MockTransport），默认使用网络连接
         """
         self.timeout = timeout
         self.max_retries = max_retries
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """获取复用的 HTTP 客户端（延迟创建，复用 TCP/TLS 连接）"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_keepalive_connections=self.MAX_KEEPALIVE_CONNECTIONS),
+                transport=self.transport
+            )
+        return self._client
+
+    async def close(self) -> None:
+        """关闭 HTTP 客户端，释放连接池"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
     async def send_notification(
         self,
@@ -58,22 +85,23 @@ class NotificationService:
             completed_at=datetime.now().isoformat(),
             error_message=error_message
         )
+        # 只序列化一次，重试时复用同一份请求体
+        body = payload.model_dump_json()
 
         # 尝试发送通知，带重试机制
         for attempt in range(1, self.max_retries + 1):
             try:
-                async with httpx.AsyncClient(timeout=self.timeout) as client:
-                    response = await client.post(
-                        callback_url,
-                        json=payload.model_dump(),
-                        headers={"Content-Type": "application/json"}
-                    )
-
-                    if response.status_code in [200, 201, 202, 204]:
-                        print(f"✅ 任务 {task_id} 通知发送成功 (状态: {status})")
-                        return True
-                    else:
-                        print(f"⚠️  任务 {task_id} 通知失败 (HTTP {response.status_code}): {response.text}")
+                response = await self._get_client().post(
+                    callback_url,
+                    content=body,
+                    headers={"Content-Type": "application/json"}
+                )
+
+                if response.status_code in [200, 201, 202, 204]:
+                    print(f"✅ 任务 {task_id} 通知发送成功 (状态: {status})")
+                    return True
+                else:
+                    print(f"⚠️  任务 {task_id} 通知失败 (HTTP {response.status_code}): {response.text}")
 
             except httpx.TimeoutException:
                 print(f"⚠️  任务 {task_id} 通知超时 (尝试 {attempt}/{self.max_retries})")
@@ -146,3 +174,31 @@ class NotificationService:
             markdown_document_path=markdown_document_path,
             error_message=error_message
         )
+
+
+# 共享通知服务实例 - 整个进程复用同一个 HTTP 连接池
+_shared_notification_service: Optional[NotificationService] = None
+
+
+def get_notification_service() -> NotificationService:
+    """
+    获取共享的通知服务实例（单例模式）
+
+    Returns:
+        NotificationService: 共享的通知服务实例
+    """
+    global _shared_notification_service
+
+    if _shared_notification_service is None:
+        _shared_notification_service = NotificationService()
+
+    return _shared_notification_service
+
+
+async def close_notification_service():
+    """关闭共享通知服务的 HTTP 连接池"""
+    global _shared_notification_service
+
+    if _shared_notification_service is not None:
+        await _shared_notification_service.close()
+        _shared_notification_service = None
@@ -3,10 +3,19 @@
 """
 import os
 import platform
-from typing import Optional, Dict, Any
+from typing import Any, ClassVar, Dict, FrozenSet, Optional
 from pathlib import Path
 from backend.database.models import Database, SettingsDAO
 
+# 支持的 CLI 类型和界面语言（模块级常量，避免每次校验时重新构建列表）；
+# 成员集合与提示文本都由同一个有序元组派生
+_CLI_TYPES = ("claude_code", "codex", "gemini")
+_VALID_CLI_TYPES = frozenset(_CLI_TYPES)
+_VALID_CLI_TYPES_TEXT = ", ".join(_CLI_TYPES)
+_LANGUAGES = ("zh", "en")
+_VALID_LANGUAGES = frozenset(_LANGUAGES)
+_VALID_LANGUAGES_TEXT = ", ".join(_LANGUAGES)
+
 
 class SettingsService:
     """系统设置服务 - 异步版本"""
@@ -32,6 +41,16 @@ class SettingsService:
         "Windows": ["auto", "windows_terminal"],
     }
 
+    # 预先构建的成员集合与展示文本（按平台），未知平台仅支持 auto
+    _SUPPORTED_TERMINAL_SETS: ClassVar[Dict[str, FrozenSet[str]]] = {
+        system: frozenset(v) for system, v in SUPPORTED_TERMINALS.items()
+    }
+    _SUPPORTED_TERMINALS_TEXT: ClassVar[Dict[str, str]] = {
+        system: ", ".join(v) for system, v in SUPPORTED_TERMINALS.items()
+    }
+    _FALLBACK_TERMINAL_SET = frozenset(("auto",))
+    _FALLBACK_TERMINALS_TEXT = "auto"
+
     def __init__(self, db_path: str = None, db: Database = None):
         """
         初始化设置服务
@@ -67,8 +86,8 @@ class SettingsService:
     def _get_setting_description(self, key: str) -> str:
         """获取设置项描述"""
         system = platform.system()
-        supported = self.SUPPORTED_TERMINALS.get(system, ["auto"])
-        terminal_desc = f"终端类型，支持: {', '.join(supported)}"
+        supported_text = self._SUPPORTED_TERMINALS_TEXT.get(system, self._FALLBACK_TERMINALS_TEXT)
+        terminal_desc = f"终端类型，支持: {supported_text}"
 
         descriptions = {
             "terminal": terminal_desc,
@@ -151,9 +170,9 @@ class SettingsService:
     async def set_terminal_type(self, terminal: str) -> bool:
         """设置终端类型"""
         system = platform.system()
-        supported = self.SUPPORTED_TERMINALS.get(system, ["auto"])
-        if terminal not in supported:
-            raise ValueError(f"不支持的终端类型: {terminal}，当前平台 ({system}) 支持: {', '.join(supported)}")
+        if terminal not in self._SUPPORTED_TERMINAL_SETS.get(system, self._FALLBACK_TERMINAL_SET):
+            supported_text = self._SUPPORTED_TERMINALS_TEXT.get(system, self._FALLBACK_TERMINALS_TEXT)
+            raise ValueError(f"不支持的终端类型: {terminal}，当前平台 ({system}) 支持: {supported_text}")
         return await self.set_setting("terminal", terminal)
 
     async def get_supported_terminals(self) -> list[str]:
@@ -181,9 +200,8 @@ class SettingsService:
 
     async def set_cli_type(self, cli_type: str) -> bool:
         """设置默认 CLI 类型"""
-        valid_types = ["claude_code", "codex", "gemini"]
-        if cli_type not in valid_types:
-            raise ValueError(f"不支持的 CLI 类型: {cli_type}，支持: {', '.join(valid_types)}")
+        if cli_type not in _VALID_CLI_TYPES:
+            raise ValueError(f"不支持的 CLI 类型: {cli_type}，支持: {_VALID_CLI_TYPES_TEXT}")
         return await self.set_setting("default_cli", cli_type)
 
     async def get_review_cli_type(self) -> str:
@@ -193,9 +211,8 @@ class SettingsService:
 
     async def set_review_cli_type(self, cli_type: str) -> bool:
         """设置 Review 阶段使用的 CLI 类型"""
-        valid_types = ["claude_code", "codex", "gemini"]
-        if cli_type not in valid_types:
-            raise ValueError(f"不支持的 CLI 类型: {cli_type}，支持: {', '.join(valid_types)}")
+        if cli_type not in _VALID_CLI_TYPES:
+            raise ValueError(f"不支持的 CLI 类型: {cli_type}，支持: {_VALID_CLI_TYPES_TEXT}")
         return await self.set_setting("review_cli", cli_type)
 
     async def get_review_enabled(self) -> bool:
@@ -231,9 +248,8 @@ class SettingsService:
 
     async def set_language(self, language: str) -> bool:
         """设置界面语言"""
-        valid_languages = ["zh", "en"]
-        if language not in valid_languages:
-            raise ValueError(f"不支持的语言: {language}，支持: {', '.join(valid_languages)}")
+        if language not in _VALID_LANGUAGES:
+            raise ValueError(f"不支持的语言: {language}，支持: {_VALID_LANGUAGES_TEXT}")
         return await self.set_setting("language", language)
 
     async def get_watchdog_heartbeat_timeout(self) -> float:
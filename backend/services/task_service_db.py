@@ -11,7 +11,7 @@ from backend.models.schemas import (
     TaskModel, TaskLogModel,
     TaskCreateRequest, TaskUpdateRequest
 )
-from backend.services.notification_service import NotificationService
+from backend.services.notification_service import get_notification_service
 
 
 class TaskServiceDB:
@@ -21,6 +21,9 @@ class TaskServiceDB:
     LOG_BUFFER_SIZE = 10  # 缓冲区大小，达到此数量自动刷新
     LOG_BUFFER_TIMEOUT = 2.0  # 缓冲超时（秒），超时自动刷新
 
+    # update_task 中无需转换、直接写入数据库的字段
+    _PASSTHROUGH_UPDATE_FIELDS = frozenset(('status', 'cli_type', 'callback_url', 'enable_review'))
+
     def __init__(self, db_path: str = "aitaskrunner.db", db: Database = None):
         """
         初始化任务服务
@@ -37,7 +40,7 @@ class TaskServiceDB:
             self.db = Database(db_path)
         self.task_dao = TaskDAO(self.db)
         self.project_dao = ProjectDAO(self.db)
-        self.notification_service = NotificationService()
+        self.notification_service = get_notification_service()
         self._initialized = False
 
         # 优化4.3: 日志缓冲区
@@ -45,6 +48,9 @@ class TaskServiceDB:
         self._log_buffer_lock = asyncio.Lock()
         self._flush_task: Optional[asyncio.Task] = None
 
+        # 进行中的回调通知任务（持有引用，避免被提前回收）
+        self._notify_tasks: set[asyncio.Task] = set()
+
     def _validate_paths(self, project_directory: str, markdown_document_path: str) -> None:
         """
         验证项目目录和文档路径
@@ -132,8 +138,8 @@ class TaskServiceDB:
         relative_path = request.markdown_document_relative_path.lstrip('/')
         markdown_document_path = str(Path(project_directory) / relative_path)
 
-        # 验证路径有效性
-        self._validate_paths(project_directory, markdown_document_path)
+        # 验证路径有效性（文件系统 I/O 放到线程中执行，避免阻塞事件循环）
+        await asyncio.to_thread(self._validate_paths, project_directory, markdown_document_path)
 
         # 准备任务数据
         task_data = {
@@ -163,50 +169,45 @@ class TaskServiceDB:
         if not current_task:
             return None
 
+        # 只取客户端实际传入且非空的字段
+        changed = request.model_dump(exclude_unset=True, exclude_none=True)
         updates = {}
 
         # 确定最终的项目目录（优先使用 project_id）
         final_project_dir = current_task.project_directory
-        if request.project_id is not None:
-            project = await self.project_dao.get_project(request.project_id)
+        if 'project_id' in changed:
+            project = await self.project_dao.get_project(changed['project_id'])
             if not project:
-                raise ValueError(f"Project not found: {request.project_id}")
+                raise ValueError(f"Project not found: {changed['project_id']}")
             final_project_dir = project['directory_path']
             updates['project_directory'] = final_project_dir
-        elif request.project_directory is not None:
-            final_project_dir = request.project_directory
-            updates['project_directory'] = request.project_directory
+        elif 'project_directory' in changed:
+            final_project_dir = changed['project_directory']
+            updates['project_directory'] = final_project_dir
 
         final_doc_path = current_task.markdown_document_path
 
         # 处理相对路径更新
-        if request.markdown_document_relative_path is not None:
-            relative_path = request.markdown_document_relative_path.lstrip('/')
+        if 'markdown_document_relative_path' in changed:
+            relative_path = changed['markdown_document_relative_path'].lstrip('/')
             final_doc_path = str(Path(final_project_dir) / relative_path)
             updates['markdown_document_path'] = final_doc_path
 
         # 如果更新了项目目录或文档路径，进行验证
         if 'project_directory' in updates or 'markdown_document_path' in updates:
-            self._validate_paths(final_project_dir, final_doc_path)
-
-        if request.status is not None:
-            updates['status'] = request.status
-
-        if request.cli_type is not None:
-            updates['cli_type'] = request.cli_type
-
-        if request.callback_url is not None:
-            updates['callback_url'] = request.callback_url
+            await asyncio.to_thread(self._validate_paths, final_project_dir, final_doc_path)
 
-        if request.enable_review is not None:
-            updates['enable_review'] = request.enable_review
+        # 其余字段直接透传
+        updates.update({k: v for k, v in changed.items() if k in self._PASSTHROUGH_UPDATE_FIELDS})
 
         if updates:
-            success = await self.task_dao.update_task(task_id, updates)
-            if success:
-                await self.task_dao.add_log(task_id, 'INFO', f'Task updated: {", ".join(updates.keys())}')
-                # 返回更新的任务（不含日志以提升性能）
-                return await self.get_task_basic(task_id)
+            # 更新、记录日志并读回任务在同一事务中完成（不含日志以提升性能）
+            row = await self.task_dao.update_task_returning(task_id, updates, {
+                'level': 'INFO',
+                'message': f'Task updated: {", ".join(updates.keys())}'
+            })
+            if row:
+                return self._convert_to_model(row)
 
         return None
 
@@ -260,7 +261,7 @@ class TaskServiceDB:
             # 发送完成通知
             task = await self.get_task(task_id)
             if task and task.callback_url:
-                asyncio.create_task(
+                self._schedule_notification(
                     self.notification_service.notify_task_completed(
                         callback_url=task.callback_url,
                         task_id=task_id,
@@ -284,7 +285,7 @@ class TaskServiceDB:
             # 发送失败通知
             task = await self.get_task(task_id)
             if task and task.callback_url:
-                asyncio.create_task(
+                self._schedule_notification(
                     self.notification_service.notify_task_failed(
                         callback_url=task.callback_url,
                         task_id=task_id,
@@ -295,6 +296,17 @@ class TaskServiceDB:
                 )
         return success
 
+    def _schedule_notification(self, coro) -> None:
+        """在后台发送通知，并跟踪任务直到完成"""
+        task = asyncio.create_task(coro)
+        self._notify_tasks.add(task)
+        task.add_done_callback(self._notify_tasks.discard)
+
+    async def flush_notifications(self) -> None:
+        """等待所有进行中的通知发送完成（用于关闭时清理）"""
+        if self._notify_tasks:
+            await asyncio.gather(*self._notify_tasks, return_exceptions=True)
+
     async def add_task_log(self, task_id: str, level: str, message: str, flush_immediately: bool = False) -> bool:
         """
         优化4.3: 添加日志（支持缓冲）
@@ -317,18 +329,11 @@ class TaskServiceDB:
                 'timestamp': datetime.now().isoformat()
             }
 
-            # 错误日志或明确要求立即写入
-            if flush_immediately or level == 'ERROR':
-                # 先刷新缓冲区，再写入当前日志
-                await self._flush_log_buffer()
-                await self.task_dao.add_log(task_id, level, message)
-                return True
-
             async with self._log_buffer_lock:
                 self._log_buffer.append(log_entry)
 
-                # 缓冲区满，立即刷新
-                if len(self._log_buffer) >= self.LOG_BUFFER_SIZE:
+                # 错误日志、明确要求立即写入或缓冲区满时，与已缓冲日志一起批量写入
+                if flush_immediately or level == 'ERROR' or len(self._log_buffer) >= self.LOG_BUFFER_SIZE:
                     await self._flush_log_buffer_unlocked()
                 else:
                     # 启动延迟刷新任务
@@ -348,8 +353,9 @@ class TaskServiceDB:
         if not self._log_buffer:
             return
 
-        logs_to_write = self._log_buffer.copy()
-        self._log_buffer.clear()
+        # 直接交换引用，避免复制整个缓冲区
+        logs_to_write = self._log_buffer
+        self._log_buffer = []
 
         # 取消定时刷新任务
         if self._flush_task and not self._flush_task.done():
@@ -389,7 +395,7 @@ class TaskServiceDB:
         """获取任务日志"""
         await self.initialize()
         logs = await self.task_dao.get_logs(task_id, limit)
-        return [TaskLogModel(**log) for log in logs]
+        return [TaskLogModel.model_construct(**log) for log in logs]
 
     async def get_task_raw(self, task_id: str) -> Optional[dict]:
         """获取任务原始数据（不含日志，用于内部逻辑）"""
@@ -461,16 +467,21 @@ class TaskServiceDB:
         return success_count, failed_ids
 
     def _convert_to_model(self, task_dict: dict) -> TaskModel:
-        """将数据库字典转换为Pydantic模型"""
+        """
+        将数据库字典转换为Pydantic模型
+
+        数据库行是可信的内部数据，使用 model_construct 跳过校验；
+        请求模型仍在 API 边界处完整校验。
+        """
         logs = None
         if 'logs' in task_dict and task_dict['logs']:
-            logs = [TaskLogModel(**log) for log in task_dict['logs']]
+            logs = [TaskLogModel.model_construct(**log) for log in task_dict['logs']]
 
         # 处理 enable_review：数据库中 NULL->None, 0->False, 1->True
         enable_review_raw = task_dict.get('enable_review')
         enable_review = None if enable_review_raw is None else bool(enable_review_raw)
 
-        return TaskModel(
+        return TaskModel.model_construct(
             id=task_dict['id'],
             project_directory=task_dict['project_directory'],
             markdown_document_path=task_dict['markdown_document_path'],
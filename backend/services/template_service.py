@@ -1,8 +1,10 @@
 """
 Template Service - 管理提示模板 - 异步版本
 """
+import re
 from pathlib import Path
-from typing import List, Optional
+from typing import Awaitable, Dict, List, Optional, Tuple
+from weakref import WeakValueDictionary
 
 from backend.database.models import Database, TemplateDAO
 from backend.models.schemas import (
@@ -10,52 +12,67 @@ from backend.models.schemas import (
 )
 
 
-class TemplateService:
-    """模板服务 - 异步版本"""
+# 模板变量占位符：花括号内任意不含空白和花括号的名称，如 {project_dir}、{项目目录}、{doc-path}；
+# 渲染时未提供的名称保持原样
+_VAR_RE = re.compile(r'\{([^{}\s]+)\}')
 
-    def __init__(self, db_path: str = "aitaskrunner.db", db: Database = None):
-        """
-        初始化模板服务
 
-        优化6.2: 支持注入共享数据库实例
+def _compile_template(content: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """
+    将模板内容拆分为文本片段和变量名
 
-        Args:
-            db_path: 数据库文件路径（如果 db 为 None 时使用）
-            db: 共享的数据库实例（优先使用）
-        """
-        if db is not None:
-            self.db = db
-        else:
-            self.db = Database(db_path)
-        self.template_dao = TemplateDAO(self.db)
-        self._initialized = False
+    Returns:
+        (literals, names)，len(literals) == len(names) + 1
+    """
+    parts = _VAR_RE.split(content)
+    return tuple(parts[0::2]), tuple(parts[1::2])
 
-    async def initialize(self):
-        """初始化数据库和默认模板"""
-        if not self._initialized:
-            await self.db.initialize()
-            # 初始化默认模板
-            await self._init_default_templates()
-            self._initialized = True
 
-    async def _init_default_templates(self):
-        """初始化默认模板（如果不存在）"""
-        existing = await self.template_dao.get_all_templates()
+def _render_compiled(compiled: Tuple[Tuple[str, ...], Tuple[str, ...]], values: Dict[str, str]) -> str:
+    """用变量值拼接预编译的模板片段，未提供的变量保持原样"""
+    literals, names = compiled
+    out = [literals[0]]
+    for name, literal in zip(names, literals[1:]):
+        value = values.get(name)
+        out.append(f"{{{name}}}" if value is None else value)
+        out.append(literal)
+    return "".join(out)
 
-        # 检查是否需要添加 continue_task 模板（升级兼容）
-        if existing:
-            existing_types = {t['type'] for t in existing}
-            if 'continue_task' not in existing_types:
-                await self._add_continue_task_template()
-            return
 
-        # 创建默认模板
-        default_templates = [
-            {
-                'id': 'tpl_initial_default',
-                'name': '项目经理模式 - 初始任务',
-                'type': 'initial_task',
-                'content': '''你是项目经理。请根据以下需求文档制定开发计划并监督执行：
+def _select_content(template: TemplateModel, locale: str) -> str:
+    """根据语言选择模板内容，英文不存在时 fallback 到中文"""
+    if locale == 'en' and template.content_en:
+        return template.content_en
+    return template.content
+
+
+class _DefaultTemplateCache:
+    """默认模板缓存（按模板类型），generation 用于丢弃失效期间写入的旧结果"""
+
+    def __init__(self):
+        self.templates: Dict[str, TemplateModel] = {}
+        # (模板类型, 语言) -> 预编译的模板片段
+        self.compiled: Dict[Tuple[str, str], Tuple[Tuple[str, ...], Tuple[str, ...]]] = {}
+        self.generation = 0
+
+    def invalidate(self) -> None:
+        """清空缓存"""
+        self.templates.clear()
+        self.compiled.clear()
+        self.generation += 1
+
+
+# 按数据库路径共享的默认模板缓存：同一数据库上的多个服务实例
+# （API、会话管理器、CLI 监控各自打开 Database）共用缓存，任一实例修改模板时一起失效。
+# 弱引用：缓存由服务实例持有，某路径上的服务全部释放后条目随之移除，
+# 不会为每个用过的数据库（如每个测试的临时库）在进程内残留一份缓存
+_default_template_caches: "WeakValueDictionary[str, _DefaultTemplateCache]" = WeakValueDictionary()
+
+
+# ==================== 默认模板 ====================
+# 模块级常量：只在导入时创建一次，仅在数据库为空或升级时写入
+
+_TPL_INITIAL = '''你是项目经理。请根据以下需求文档制定开发计划并监督执行：
 
 @{doc_path}
 
@@ -114,15 +131,9 @@ curl -X POST {api_base_url}/api/tasks/{task_id}/notify-status \
 现在开始：
 1. 首先阅读并分析整个需求文档
 2. 然后从第一个未完成的任务项开始规划和执行
-''',
-                'description': 'Codex 作为项目经理，规划任务并指导 Claude Code 执行',
-                'is_default': 1
-            },
-            {
-                'id': 'tpl_resume_default',
-                'name': '项目经理模式 - 恢复任务',
-                'type': 'resume_task',
-                'content': '''会话已重启，请继续担任项目经理角色：
+'''
+
+_TPL_RESUME = '''会话已重启，请继续担任项目经理角色：
 
 @{doc_path}
 
@@ -179,15 +190,9 @@ curl -X POST {api_base_url}/api/tasks/{task_id}/notify-status \
 **注意**：不调用回调会导致系统无法追踪任务状态！
 
 现在开始恢复工作，继续监督和审查 Claude Code 的执行。完成或退出前**必须**调用状态回调。
-''',
-                'description': '会话重启后恢复工作',
-                'is_default': 1
-            },
-            {
-                'id': 'tpl_review_default',
-                'name': '项目完成审查',
-                'type': 'review',
-                'content': '''所有任务已执行完毕，请进行最终审查：
+'''
+
+_TPL_REVIEW = '''所有任务已执行完毕，请进行最终审查：
 
 @{doc_path}
 
@@ -241,15 +246,9 @@ curl -X POST {api_base_url}/api/tasks/{task_id}/notify-status \\
 **注意**：不调用回调会导致任务状态无法更新！
 
 现在开始审查工作。审查完成或退出前**必须**调用状态回调。
-''',
-                'description': '任务完成后的项目级审查',
-                'is_default': 1
-            },
-            {
-                'id': 'tpl_continue_default',
-                'name': '异常恢复 - 继续任务',
-                'type': 'continue_task',
-                'content': '''检测到任务可能异常停止，请继续执行：
+'''
+
+_TPL_CONTINUE = '''检测到任务可能异常停止，请继续执行：
 
 @{doc_path}
 
@@ -285,94 +284,141 @@ curl -X POST {api_base_url}/api/tasks/{task_id}/notify-status \\
 **注意**：不调用回调会导致系统无法追踪任务状态！
 
 现在请继续执行任务。完成或退出前**必须**调用状态回调。
-''',
-                'description': '异常停止后自动恢复的提示词',
-                'is_default': 1
-            }
-        ]
+'''
+
+DEFAULT_TEMPLATES = (
+    {
+        'id': 'tpl_initial_default',
+        'name': '项目经理模式 - 初始任务',
+        'type': 'initial_task',
+        'content': _TPL_INITIAL,
+        'description': 'Codex 作为项目经理，规划任务并指导 Claude Code 执行',
+        'is_default': 1
+    },
+    {
+        'id': 'tpl_resume_default',
+        'name': '项目经理模式 - 恢复任务',
+        'type': 'resume_task',
+        'content': _TPL_RESUME,
+        'description': '会话重启后恢复工作',
+        'is_default': 1
+    },
+    {
+        'id': 'tpl_review_default',
+        'name': '项目完成审查',
+        'type': 'review',
+        'content': _TPL_REVIEW,
+        'description': '任务完成后的项目级审查',
+        'is_default': 1
+    },
+    {
+        'id': 'tpl_continue_default',
+        'name': '异常恢复 - 继续任务',
+        'type': 'continue_task',
+        'content': _TPL_CONTINUE,
+        'description': '异常停止后自动恢复的提示词',
+        'is_default': 1
+    },
+)
 
-        for tpl in default_templates:
-            await self.template_dao.create_template(tpl)
+# 升级兼容时单独补充的 continue_task 模板，与默认模板共用同一份定义
+_CONTINUE_TASK_TEMPLATE = DEFAULT_TEMPLATES[3]
 
-    async def _add_continue_task_template(self):
-        """添加 continue_task 模板（升级兼容）"""
-        continue_template = {
-            'id': 'tpl_continue_default',
-            'name': '异常恢复 - 继续任务',
-            'type': 'continue_task',
-            'content': '''检测到任务可能异常停止，请继续执行：
 
-@{doc_path}
+class TemplateService:
+    """模板服务 - 异步版本"""
 
-项目目录: {project_dir}
-任务ID: {task_id}
-API回调地址: {api_base_url}
+    def __init__(self, db_path: str = "aitaskrunner.db", db: Database = None):
+        """
+        初始化模板服务
 
-**请检查**:
-1. 查看文档中的任务进度（已完成 [x] 和未完成 [ ]）
-2. 确认当前工作状态
-3. 继续执行未完成的任务
+        优化6.2: 支持注入共享数据库实例
 
-**⚠️ 重要：状态回调（必须执行）**:
-任务执行过程中和完成后，**必须**调用状态通知接口，否则系统无法追踪任务状态：
+        Args:
+            db_path: 数据库文件路径（如果 db 为 None 时使用）
+            db: 共享的数据库实例（优先使用）
+        """
+        # 未注入 db 时延迟到首次访问再创建 Database，避免随后被替换的实例白白构建连接池
+        self._db_path = db.db_path if db is not None else db_path
+        self._db = db
+        self._template_dao: Optional[TemplateDAO] = None
+        self._initialized = False
+        self._default_cache = _default_template_caches.setdefault(self._db_path, _DefaultTemplateCache())
+
+    @property
+    def db(self) -> Database:
+        """数据库实例（首次访问时创建）"""
+        if self._db is None:
+            self._db = Database(self._db_path)
+        return self._db
+
+    @property
+    def template_dao(self) -> TemplateDAO:
+        """模板 DAO（首次访问时创建）"""
+        if self._template_dao is None:
+            self._template_dao = TemplateDAO(self.db)
+        return self._template_dao
 
-```bash
-# 会话完成（还有剩余任务）
-curl -X POST {api_base_url}/api/tasks/{task_id}/notify-status \\
-  -H "Content-Type: application/json" \\
-  -d '{"status": "session_completed", "message": "继续执行"}'
+    async def initialize(self):
+        """
+        初始化数据库和默认模板
 
-# 所有任务完成
-curl -X POST {api_base_url}/api/tasks/{task_id}/notify-status \\
-  -H "Content-Type: application/json" \\
-  -d '{"status": "completed", "message": "所有任务已完成"}'
+        各方法调用前先检查 self._initialized，已初始化时不再创建协程
+        """
+        if not self._initialized:
+            await self.db.initialize()
+            # 初始化默认模板
+            await self._init_default_templates()
+            self._initialized = True
 
-# 任务失败
-curl -X POST {api_base_url}/api/tasks/{task_id}/notify-status \\
-  -H "Content-Type: application/json" \\
-  -d '{"status": "failed", "error": "错误描述"}'
-```
+    async def _init_default_templates(self):
+        """初始化默认模板（如果不存在）"""
+        existing = await self.template_dao.get_all_templates()
 
-**注意**：不调用回调会导致系统无法追踪任务状态！
+        # 检查是否需要添加 continue_task 模板（升级兼容）
+        if existing:
+            existing_types = {t['type'] for t in existing}
+            if 'continue_task' not in existing_types:
+                await self._add_continue_task_template()
+            return
 
-现在请继续执行任务。完成或退出前**必须**调用状态回调。
-''',
-            'description': '异常停止后自动恢复的提示词',
-            'is_default': 1
-        }
-        await self.template_dao.create_template(continue_template)
+        # 创建默认模板（单个事务批量写入）
+        await self.template_dao.create_templates_bulk(list(DEFAULT_TEMPLATES))
+
+    async def _add_continue_task_template(self):
+        """添加 continue_task 模板（升级兼容）"""
+        await self.template_dao.create_template(_CONTINUE_TASK_TEMPLATE)
 
     async def get_all_templates(self) -> List[TemplateModel]:
         """获取所有模板"""
-        await self.initialize()
+        if not self._initialized:
+            await self.initialize()
         templates = await self.template_dao.get_all_templates()
         return [self._convert_to_model(t) for t in templates]
 
     async def get_template(self, template_id: str) -> Optional[TemplateModel]:
         """获取单个模板"""
-        await self.initialize()
-        template = await self.template_dao.get_template(template_id)
-        if template:
-            return self._convert_to_model(template)
-        return None
+        if not self._initialized:
+            await self.initialize()
+        return await self._fetch_one(self.template_dao.get_template(template_id))
 
     async def get_templates_by_type(self, template_type: str) -> List[TemplateModel]:
         """获取指定类型的所有模板"""
-        await self.initialize()
+        if not self._initialized:
+            await self.initialize()
         templates = await self.template_dao.get_templates_by_type(template_type)
         return [self._convert_to_model(t) for t in templates]
 
     async def get_default_template(self, template_type: str) -> Optional[TemplateModel]:
         """获取指定类型的默认模板"""
-        await self.initialize()
-        template = await self.template_dao.get_template_by_type(template_type, use_default=True)
-        if template:
-            return self._convert_to_model(template)
-        return None
+        if not self._initialized:
+            await self.initialize()
+        return await self._fetch_one(self.template_dao.get_template_by_type(template_type, use_default=True))
 
     async def create_template(self, request: TemplateCreateRequest) -> TemplateModel:
         """创建新模板"""
-        await self.initialize()
+        if not self._initialized:
+            await self.initialize()
         template_data = {
             'name': request.name,
             'type': request.type,
@@ -384,17 +430,18 @@ curl -X POST {api_base_url}/api/tasks/{task_id}/notify-status \\
 
         # 如果设为默认，先清除其他默认
         if request.is_default:
-            existing_defaults = await self.template_dao.get_templates_by_type(request.type)
-            for tpl in existing_defaults:
-                if tpl.get('is_default'):
-                    await self.template_dao.update_template(tpl['id'], {'is_default': 0})
+            await self.template_dao.clear_defaults_for_type(request.type)
 
-        template_id = await self.template_dao.create_template(template_data)
-        return await self.get_template(template_id)
+        # 插入的行已在本地构建，直接转换，无需再查询一次
+        row = await self.template_dao.create_template_returning(template_data)
+        if request.is_default:
+            self._default_cache.invalidate()
+        return self._convert_to_model(row)
 
     async def update_template(self, template_id: str, request: TemplateUpdateRequest) -> Optional[TemplateModel]:
         """更新模板"""
-        await self.initialize()
+        if not self._initialized:
+            await self.initialize()
         updates = {}
 
         if request.name is not None:
@@ -409,32 +456,40 @@ curl -X POST {api_base_url}/api/tasks/{task_id}/notify-status \\
             updates['description'] = request.description
         if request.is_default is not None:
             if request.is_default:
-                # 设为默认前先清除其他默认
-                template = await self.template_dao.get_template(template_id)
-                if template:
-                    tpl_type = request.type or template['type']
-                    existing_defaults = await self.template_dao.get_templates_by_type(tpl_type)
-                    for tpl in existing_defaults:
-                        if tpl.get('is_default') and tpl['id'] != template_id:
-                            await self.template_dao.update_template(tpl['id'], {'is_default': 0})
+                # 设为默认前先清除其他默认（未修改类型时才需查询原类型）
+                tpl_type = request.type
+                if tpl_type is None:
+                    template = await self.template_dao.get_template(template_id)
+                    tpl_type = template['type'] if template else None
+                if tpl_type is not None:
+                    await self.template_dao.clear_defaults_for_type(tpl_type, except_id=template_id)
             updates['is_default'] = 1 if request.is_default else 0
 
         if updates:
-            success = await self.template_dao.update_template(template_id, updates)
-            if success:
-                return await self.get_template(template_id)
+            row = await self.template_dao.update_template_returning(template_id, updates)
+            if row:
+                self._default_cache.invalidate()
+                return self._convert_to_model(row)
 
         return None
 
     async def delete_template(self, template_id: str) -> bool:
         """删除模板"""
-        await self.initialize()
-        return await self.template_dao.delete_template(template_id)
+        if not self._initialized:
+            await self.initialize()
+        success = await self.template_dao.delete_template(template_id)
+        if success:
+            self._default_cache.invalidate()
+        return success
 
     async def set_default_template(self, template_id: str) -> bool:
         """设置默认模板"""
-        await self.initialize()
-        return await self.template_dao.set_default_template(template_id)
+        if not self._initialized:
+            await self.initialize()
+        success = await self.template_dao.set_default_template(template_id)
+        if success:
+            self._default_cache.invalidate()
+        return success
 
     async def render_template(self, template_type: str, locale: str = 'zh', **kwargs) -> str:
         """
@@ -462,27 +517,93 @@ curl -X POST {api_base_url}/api/tasks/{task_id}/notify-status \\
         Returns:
             渲染后的模板内容
         """
-        await self.initialize()
-        template = await self.get_default_template(template_type)
-        if not template:
-            raise ValueError(f"No default template found for type: {template_type}")
+        if not self._initialized:
+            await self.initialize()
+        cache = self._default_cache
+        compiled_key = (template_type, locale)
+        compiled = cache.compiled.get(compiled_key)
+        if compiled is None:
+            generation = cache.generation
+            template = cache.templates.get(template_type)
+            if template is None:
+                template = await self.get_default_template(template_type)
+                if not template:
+                    raise ValueError(f"No default template found for type: {template_type}")
+
+            compiled = _compile_template(_select_content(template, locale))
+            # 查询期间缓存未失效时才写入，避免缓存已被修改的旧模板
+            if generation == cache.generation:
+                cache.templates[template_type] = template
+                cache.compiled[compiled_key] = compiled
+
+        return _render_compiled(compiled, {key: str(value) for key, value in kwargs.items()})
+
+    async def render_templates_batch(self, template_types: List[str], locale: str = 'zh', **kwargs) -> Dict[str, str]:
+        """
+        批量渲染多个类型的默认模板
 
-        # 根据语言选择内容
-        if locale == 'en' and template.content_en:
-            content = template.content_en
-        else:
-            # 默认使用中文，或者当英文不存在时 fallback 到中文
-            content = template.content
+        未缓存的默认模板通过一次查询取回，所有模板使用同一组变量渲染
 
-        # 替换变量
-        for key, value in kwargs.items():
-            content = content.replace(f"{{{key}}}", str(value))
+        Args:
+            template_types: 模板类型列表
+            locale: 语言代码 ('zh' 或 'en')
+            **kwargs: 模板变量
 
-        return content
+        Returns:
+            模板类型 -> 渲染后的模板内容
+        """
+        if not self._initialized:
+            await self.initialize()
+        cache = self._default_cache
+        generation = cache.generation
+
+        # 先取出已缓存的结果（查询期间缓存可能被清空），其余类型一次查询取回
+        compiled_by_type: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {}
+        templates: Dict[str, TemplateModel] = {}
+        missing = []
+        for template_type in dict.fromkeys(template_types):
+            compiled = cache.compiled.get((template_type, locale))
+            if compiled is not None:
+                compiled_by_type[template_type] = compiled
+            elif template_type in cache.templates:
+                templates[template_type] = cache.templates[template_type]
+            else:
+                missing.append(template_type)
+
+        if missing:
+            for row in await self.template_dao.get_default_templates_by_types(missing):
+                templates.setdefault(row['type'], self._convert_to_model(row))
+            for template_type in missing:
+                if template_type not in templates:
+                    raise ValueError(f"No default template found for type: {template_type}")
+
+        for template_type, template in templates.items():
+            compiled = _compile_template(_select_content(template, locale))
+            compiled_by_type[template_type] = compiled
+            # 查询期间缓存未失效时才写入
+            if generation == cache.generation:
+                cache.templates[template_type] = template
+                cache.compiled[(template_type, locale)] = compiled
+
+        values = {key: str(value) for key, value in kwargs.items()}
+        return {
+            template_type: _render_compiled(compiled_by_type[template_type], values)
+            for template_type in dict.fromkeys(template_types)
+        }
+
+    async def _fetch_one(self, row_coro: Awaitable[Optional[dict]]) -> Optional[TemplateModel]:
+        """等待 DAO 查询并转换单行结果，未找到时返回 None（单行查询的统一转换入口）"""
+        row = await row_coro
+        return self._convert_to_model(row) if row else None
 
     def _convert_to_model(self, template_dict: dict) -> TemplateModel:
-        """转换为 Pydantic 模型"""
-        return TemplateModel(
+        """
+        转换为 Pydantic 模型
+
+        数据库行是可信的内部数据，使用 model_construct 跳过校验；
+        创建/更新请求仍在 API 边界处完整校验。
+        """
+        return TemplateModel.model_construct(
             id=template_dict['id'],
             name=template_dict['name'],
             name_en=template_dict.get('name_en'),
@@ -5,31 +5,152 @@ Backend Tests - Shared Fixtures
 import os
 import sys
 import asyncio
+import hashlib
+import shutil
 import tempfile
 from pathlib import Path
-from typing import AsyncGenerator, Generator
+from typing import AsyncGenerator, Callable, Generator, Optional
 
 import pytest
+import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
 
+# uvloop (installed with uvicorn[standard], unavailable on Windows) runs the
+# event loop in C; fall back to the stdlib loop when it is missing.
+_loop_factory: Callable[[], asyncio.AbstractEventLoop]
+_loop_policy_factory: Callable[[], asyncio.AbstractEventLoopPolicy]
+try:
+    import uvloop
+    _loop_factory = uvloop.new_event_loop
+    _loop_policy_factory = uvloop.EventLoopPolicy
+except ImportError:
+    _loop_factory = asyncio.new_event_loop
+    _loop_policy_factory = asyncio.DefaultEventLoopPolicy
+
 # 添加项目根目录到路径
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
 
+try:
+    from pytest_asyncio.plugin import PytestAsyncioSpecs
+    _HAS_LOOP_FACTORIES_HOOK = hasattr(PytestAsyncioSpecs, "pytest_asyncio_loop_factories")
+except ImportError:
+    _HAS_LOOP_FACTORIES_HOOK = False
+
+
+if _HAS_LOOP_FACTORIES_HOOK:
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_asyncio_loop_factories(config, item):
+        """Loop factory hook of newer pytest-asyncio (which deprecates event_loop_policy)."""
+        return {"loop": _loop_factory}
+else:
+    @pytest.fixture(scope="session")
+    def event_loop_policy() -> asyncio.AbstractEventLoopPolicy:
+        """Event loop policy for pytest-asyncio releases without the loop-factories hook.
+
+        Loops are created by pytest-asyncio per test or per ``loop_scope``;
+        there is deliberately no ``event_loop`` override.
+        """
+        return _loop_policy_factory()
+
+
+async def _build_seed_database(db_path: str) -> None:
+    """Create a fully initialized database (schema + default templates)."""
+    from backend.database.models import Database
+    from backend.services.settings_service import SettingsService
+    from backend.services.template_service import TemplateService
+
+    db = Database(db_path, pool_size=1, pragmas=TEST_DB_PRAGMAS)
+    await db.initialize()
+
+    # Add missing columns for compatibility (one table_info read, one commit)
+    async with db.get_connection() as conn:
+        cursor = await conn.execute("PRAGMA table_info(prompt_templates)")
+        existing = {row[1] for row in await cursor.fetchall()}
+        for column in ("content_en", "name_en", "description_en"):
+            if column not in existing:
+                await conn.execute(f"ALTER TABLE prompt_templates ADD COLUMN {column} TEXT")
+
+    # Seed default templates and settings
+    await TemplateService(db=db).initialize()
+    await SettingsService(db=db).initialize()
+    await db.close()
+
+
+# The test database is disposable: skip fsync and keep temp tables in memory.
+# journal_mode/locking_mode are left alone, since the pool opens several
+# connections on the same WAL file and EXCLUSIVE locking would block them.
+TEST_DB_PRAGMAS = (
+    "synchronous=OFF",
+    "temp_store=MEMORY",
+    "mmap_size=67108864",
+)
+
+
+# Sources that decide the content of the seed database; editing any of them
+# invalidates the copy cached by _seed_db_path.
+_SEED_SOURCES = (
+    "backend/database/models.py",
+    "backend/models/schemas.py",
+    "backend/services/settings_service.py",
+    "backend/services/template_service.py",
+    "backend/tests/conftest.py",
+)
+
+
+def _seed_fingerprint() -> str:
+    """Hash of the seed sources, used as the cache key of the seed database."""
+    digest = hashlib.sha256()
+    for source in _SEED_SOURCES:
+        digest.update((project_root / source).read_bytes())
+    return digest.hexdigest()[:16]
+
+
 @pytest.fixture(scope="session")
-def event_loop() -> Generator[asyncio.AbstractEventLoop, None, None]:
-    """Create an event loop for the test session."""
-    loop = asyncio.new_event_loop()
-    yield loop
-    loop.close()
+def _seed_db_path(request, tmp_path_factory) -> str:
+    """Build the seed database once per session; tests get a copy of it.
+
+    The built file is also kept in pytest's cache directory, keyed by
+    _seed_fingerprint(), so later runs copy it instead of rebuilding it
+    (always rebuilt under ``-p no:cacheprovider``).
+    """
+    db_path = str(tmp_path_factory.mktemp("seed_db") / "seed.db")
+    cache = getattr(request.config, "cache", None)
+    if cache is None:
+        asyncio.run(_build_seed_database(db_path))
+        return db_path
+
+    cache_dir = cache.mkdir("seed_db")
+    cached = cache_dir / f"seed-{_seed_fingerprint()}.db"
+    if cached.exists():
+        shutil.copyfile(cached, db_path)
+        return db_path
+
+    asyncio.run(_build_seed_database(db_path))
+    # Publish atomically: xdist workers may build the same seed concurrently
+    partial = cache_dir / f"{cached.name}.{os.getpid()}.tmp"
+    shutil.copyfile(db_path, partial)
+    os.replace(partial, cached)
+    for stale in cache_dir.glob("seed-*.db"):
+        if stale != cached:
+            stale.unlink(missing_ok=True)
+    return db_path
 
 
 @pytest.fixture(scope="function")
-async def temp_db_path() -> AsyncGenerator[str, None]:
-    """Create a temporary database file for testing."""
+def temp_db_path(_seed_db_path: str) -> Generator[str, None, None]:
+    """Create a temporary database file for testing (copied from the seed DB).
+
+    Each test gets its own file rather than a rollback of a shared session
+    database: the pool hands out several connections and Database.get_connection
+    commits after every block, so a SAVEPOINT on one connection cannot undo
+    writes made through the others (and the commit would release it anyway).
+    Copying the pre-seeded file keeps per-test setup to one file copy.
+    """
     with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as f:
         db_path = f.name
+    shutil.copyfile(_seed_db_path, db_path)
     yield db_path
     # Cleanup
     if os.path.exists(db_path):
@@ -41,39 +162,50 @@ async def temp_db_path() -> AsyncGenerator[str, None]:
             os.unlink(wal_file)
 
 
-@pytest.fixture(scope="function")
+# Connection pool size for test databases. The suite runs requests one at a
+# time, so a small pool opens fastest; raise TEST_DB_POOL when running tests
+# that fan out concurrent requests through async_client.
+TEST_DB_POOL_SIZE = int(os.environ.get("TEST_DB_POOL", "2"))
+
+
+# The async fixtures below stay function-scoped (fresh database and services
+# per test) but run on the module loop, so the pool, its queue and the
+# aiosqlite connections live on the loop the test uses. Modules requesting
+# them must run their tests there too:
+# ``pytestmark = pytest.mark.asyncio(loop_scope="module")``.
+@pytest_asyncio.fixture(loop_scope="module")
 async def test_database(temp_db_path: str):
     """Create a test database instance."""
     from backend.database.models import Database
 
-    db = Database(temp_db_path, pool_size=2)
+    db = Database(temp_db_path, pool_size=TEST_DB_POOL_SIZE, pragmas=TEST_DB_PRAGMAS)
     await db.initialize()
 
-    # Add missing columns for compatibility
-    async with db.get_connection() as conn:
-        cursor = await conn.cursor()
-        # Add content_en column if not exists
-        try:
-            await cursor.execute("ALTER TABLE prompt_templates ADD COLUMN content_en TEXT")
-        except Exception:
-            pass  # Column may already exist
-
-        # Add name_en and description_en columns
-        try:
-            await cursor.execute("ALTER TABLE prompt_templates ADD COLUMN name_en TEXT")
-        except Exception:
-            pass
-
-        try:
-            await cursor.execute("ALTER TABLE prompt_templates ADD COLUMN description_en TEXT")
-        except Exception:
-            pass
+    yield db
+    await db.close()
+
+
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def module_database(_seed_db_path: str, tmp_path_factory):
+    """A test database shared by every test of one module.
+
+    For modules whose tests only touch a few rows: the module restores those
+    rows itself between tests (see test_settings_service.py) instead of
+    copying and opening a fresh database per test. Tests using it must run
+    on the module loop: ``pytestmark = pytest.mark.asyncio(loop_scope="module")``.
+    """
+    from backend.database.models import Database
+
+    db_path = str(tmp_path_factory.mktemp("module_db") / "test.db")
+    shutil.copyfile(_seed_db_path, db_path)
+    db = Database(db_path, pool_size=TEST_DB_POOL_SIZE, pragmas=TEST_DB_PRAGMAS)
+    await db.initialize()
 
     yield db
     await db.close()
 
 
-@pytest.fixture(scope="function")
+@pytest_asyncio.fixture(loop_scope="module")
 async def test_app(test_database, monkeypatch):
     """Create a test FastAPI application with test database."""
     from backend.database.shared import reset_shared_database
@@ -112,6 +244,14 @@ async def test_app(test_database, monkeypatch):
     app_module.template_service = TemplateService(db=test_database)
     app_module.project_service = ProjectService(db=test_database)
 
+    # Initialize the services concurrently; they share the test database pool
+    await asyncio.gather(
+        app_module.settings_service.initialize(),
+        app_module.task_service.initialize(),
+        app_module.template_service.initialize(),
+        app_module.project_service.initialize(),
+    )
+
     # Initialize codex_service with mocked dependencies
     # Note: CodexService requires special handling due to its dependencies
     app_module.codex_service = CodexService(
@@ -125,15 +265,114 @@ async def test_app(test_database, monkeypatch):
     reset_shared_database()
 
 
-@pytest.fixture(scope="function")
-async def async_client(test_app) -> AsyncGenerator[AsyncClient, None]:
+@pytest.fixture(scope="session")
+def asgi_transport() -> ASGITransport:
+    """ASGI transport shared by the session.
+
+    The FastAPI app object never changes; test_app only swaps the services it
+    calls, so one transport can serve every test.
+    """
+    import backend.app as app_module
+
+    return ASGITransport(app=app_module.app)
+
+
+@pytest_asyncio.fixture(loop_scope="module")
+async def async_client(test_app, asgi_transport) -> AsyncGenerator[AsyncClient, None]:
     """Create an async HTTP client for testing API endpoints."""
-    transport = ASGITransport(app=test_app)
-    async with AsyncClient(transport=transport, base_url="http://test") as client:
+    async with AsyncClient(transport=asgi_transport, base_url="http://test") as client:
         yield client
 
 
+@pytest.fixture(scope="session")
+def todo_project_dir(tmp_path_factory) -> str:
+    """A project directory containing TODO.md, written once per session (read-only for tests)."""
+    project_dir = tmp_path_factory.mktemp("proj")
+    (project_dir / "TODO.md").write_text("# Tasks\n\n- [ ] Task 1\n")
+    return str(project_dir)
+
+
+@pytest.fixture(scope="function")
+def project_factory(async_client, todo_project_dir):
+    """Create projects through the API, at most once per directory per test.
+
+    Each test has its own database, so projects cannot be shared across tests;
+    repeated calls within a test return the cached id.
+    """
+    project_ids: dict[str, str] = {}
+
+    async def create_project(directory_path: Optional[str] = None, name: str = "Test Project") -> str:
+        directory_path = directory_path or todo_project_dir
+        if directory_path not in project_ids:
+            response = await async_client.post(
+                "/api/projects",
+                json={"name": name, "directory_path": directory_path}
+            )
+            assert response.status_code == 200
+            project_ids[directory_path] = response.json()["id"]
+        return project_ids[directory_path]
+
+    return create_project
+
+
+@pytest_asyncio.fixture(loop_scope="module")
+async def created_project(async_client) -> str:
+    """Create one project through the API and return its id."""
+    response = await async_client.post(
+        "/api/projects",
+        json={"name": "Lifecycle Project", "directory_path": "/tmp/lifecycle-project"}
+    )
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+@pytest_asyncio.fixture(loop_scope="module")
+async def created_task(async_client, project_factory) -> str:
+    """Create one pending task (backed by todo_project_dir/TODO.md) and return its id."""
+    project_id = await project_factory(name="Task Test Project")
+    response = await async_client.post("/api/tasks", json={
+        "project_id": project_id,
+        "markdown_document_relative_path": "/TODO.md",
+        "cli_type": "claude_code"
+    })
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
 @pytest.fixture(scope="function")
+def mock_terminal_adapter(monkeypatch):
+    """Patch CodexService.get_terminal_adapter with an adapter whose create_window succeeds immediately.
+
+    Tests can override ``mock_terminal_adapter.create_window.return_value``.
+    """
+    from unittest.mock import AsyncMock, MagicMock
+    from backend.services.codex_service import CodexService
+    from core.terminal_adapters.base import TerminalAdapter, TerminalSession
+
+    mock_session = MagicMock(spec=TerminalSession, session_id="test_session_123")
+
+    mock_adapter = MagicMock(spec=TerminalAdapter)
+    mock_adapter.create_window = AsyncMock(return_value=mock_session)
+
+    async def mock_get_terminal_adapter(self, terminal_type=None):
+        return mock_adapter
+
+    monkeypatch.setattr(CodexService, "get_terminal_adapter", mock_get_terminal_adapter)
+    return mock_adapter
+
+
+@pytest.fixture(scope="function")
+def no_terminal_adapter(monkeypatch) -> None:
+    """Patch CodexService.get_terminal_adapter to report that no terminal is available."""
+    from backend.services.codex_service import CodexService
+
+    async def mock_get_terminal_adapter(self, terminal_type=None):
+        return None
+
+    monkeypatch.setattr(CodexService, "get_terminal_adapter", mock_get_terminal_adapter)
+
+
+@pytest_asyncio.fixture(loop_scope="module")
 async def task_service(test_database):
     """Create a TaskServiceDB instance for testing."""
     from backend.services.task_service_db import TaskServiceDB
@@ -142,7 +381,7 @@ async def task_service(test_database):
     yield service
 
 
-@pytest.fixture(scope="function")
+@pytest_asyncio.fixture(loop_scope="module")
 async def project_service(test_database):
     """Create a ProjectService instance for testing."""
     from backend.services.project_service import ProjectService
@@ -151,7 +390,7 @@ async def project_service(test_database):
     yield service
 
 
-@pytest.fixture(scope="function")
+@pytest_asyncio.fixture(loop_scope="module")
 async def template_service(test_database):
     """Create a TemplateService instance for testing."""
     from backend.services.template_service import TemplateService
@@ -160,7 +399,7 @@ async def template_service(test_database):
     yield service
 
 
-@pytest.fixture(scope="function")
+@pytest_asyncio.fixture(loop_scope="module")
 async def settings_service(test_database):
     """Create a SettingsService instance for testing."""
     from backend.services.settings_service import SettingsService
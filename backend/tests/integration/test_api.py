@@ -2,14 +2,38 @@
 API Integration Tests
 后端 API 集成测试
 """
+import asyncio
+
 import pytest
-from unittest.mock import AsyncMock, MagicMock, patch
+import pytest_asyncio
+
+from backend.models.schemas import ProjectCreateRequest
+from backend.services.codex_service import CodexService
+
+# 本模块的测试共用一个事件循环，不再为每个测试新建；
+# 使用 pytest-xdist (--dist=loadgroup) 时整个模块留在同一个 worker 上，
+# 模块级的事件循环和 launch_dir 只创建一次
+pytestmark = [
+    pytest.mark.asyncio(loop_scope="module"),
+    pytest.mark.xdist_group("api"),
+]
+
+# 接口路径，修改路由时只需改这里
+PROJECTS = "/api/projects"
+TASKS = "/api/tasks"
+TEMPLATES = "/api/templates"
+SETTINGS = "/api/settings"
+SESSIONS = "/api/sessions"
+
+
+def url(base: str, *parts: str) -> str:
+    """拼接接口路径，如 url(TASKS, task_id, "logs")"""
+    return "/".join((base, *parts))
 
 
 class TestHealthAPI:
     """测试健康检查 API"""
 
-    @pytest.mark.asyncio
     async def test_root_endpoint(self, async_client):
         """测试根路径"""
         response = await async_client.get("/")
@@ -18,7 +42,6 @@ class TestHealthAPI:
         assert data["status"] == "running"
         assert "version" in data
 
-    @pytest.mark.asyncio
     async def test_health_check(self, async_client):
         """测试健康检查"""
         response = await async_client.get("/health")
@@ -31,14 +54,12 @@ class TestHealthAPI:
 class TestProjectsAPI:
     """测试项目 API"""
 
-    @pytest.mark.asyncio
     async def test_get_all_projects_empty(self, async_client):
         """测试获取空项目列表"""
-        response = await async_client.get("/api/projects")
+        response = await async_client.get(PROJECTS)
         assert response.status_code == 200
         assert isinstance(response.json(), list)
 
-    @pytest.mark.asyncio
     async def test_create_project(self, async_client):
         """测试创建项目"""
         project_data = {
@@ -46,225 +67,113 @@ class TestProjectsAPI:
             "directory_path": "/tmp/test-project",
             "description": "A test project"
         }
-        response = await async_client.post("/api/projects", json=project_data)
+        response = await async_client.post(PROJECTS, json=project_data)
         assert response.status_code == 200
         data = response.json()
         assert data["name"] == "Test Project"
         assert data["directory_path"] == "/tmp/test-project"
         assert "id" in data
 
-    @pytest.mark.asyncio
-    async def test_get_project(self, async_client):
-        """测试获取项目"""
-        # 先创建项目
-        project_data = {
-            "name": "Get Project Test",
-            "directory_path": "/tmp/get-project-test"
-        }
-        create_response = await async_client.post("/api/projects", json=project_data)
-        project_id = create_response.json()["id"]
-
-        # 获取项目
-        response = await async_client.get(f"/api/projects/{project_id}")
-        assert response.status_code == 200
-        data = response.json()
-        assert data["id"] == project_id
-        assert data["name"] == "Get Project Test"
-
-    @pytest.mark.asyncio
-    async def test_get_project_not_found(self, async_client):
-        """测试获取不存在的项目"""
-        response = await async_client.get("/api/projects/nonexistent_id")
-        assert response.status_code == 404
-
-    @pytest.mark.asyncio
-    async def test_update_project(self, async_client):
-        """测试更新项目"""
-        # 先创建项目
-        project_data = {
-            "name": "Update Project Test",
-            "directory_path": "/tmp/update-project-test"
-        }
-        create_response = await async_client.post("/api/projects", json=project_data)
-        project_id = create_response.json()["id"]
-
-        # 更新项目
-        update_data = {"name": "Updated Name", "description": "Updated description"}
-        response = await async_client.put(f"/api/projects/{project_id}", json=update_data)
-        assert response.status_code == 200
-        data = response.json()
-        assert data["name"] == "Updated Name"
-        assert data["description"] == "Updated description"
-
-    @pytest.mark.asyncio
-    async def test_delete_project(self, async_client):
-        """测试删除项目"""
-        # 先创建项目
-        project_data = {
-            "name": "Delete Project Test",
-            "directory_path": "/tmp/delete-project-test"
-        }
-        create_response = await async_client.post("/api/projects", json=project_data)
-        project_id = create_response.json()["id"]
-
-        # 删除项目
-        response = await async_client.delete(f"/api/projects/{project_id}")
-        assert response.status_code == 200
-
-        # 验证已删除
-        get_response = await async_client.get(f"/api/projects/{project_id}")
-        assert get_response.status_code == 404
-
-
-@pytest.mark.skip(reason="Template API tests require complex database setup - to be fixed")
-class TestTemplatesAPI:
-    """测试模板 API"""
-
-    @pytest.mark.asyncio
-    async def test_get_all_templates(self, async_client):
-        """测试获取所有模板"""
-        response = await async_client.get("/api/templates")
-        assert response.status_code == 200
-        templates = response.json()
-        assert isinstance(templates, list)
-        # 应该有默认模板
-        assert len(templates) >= 4
-
-    @pytest.mark.asyncio
-    async def test_get_templates_by_type(self, async_client):
-        """测试按类型获取模板"""
-        response = await async_client.get("/api/templates/type/initial_task")
-        assert response.status_code == 200
-        templates = response.json()
-        assert isinstance(templates, list)
-        for t in templates:
-            assert t["type"] == "initial_task"
-
-    @pytest.mark.asyncio
-    async def test_get_template(self, async_client):
-        """测试获取单个模板"""
-        response = await async_client.get("/api/templates/tpl_initial_default")
+    @pytest.mark.parametrize("verb,payload,expected", [
+        ("GET", None, {"name": "Lifecycle Project"}),
+        (
+            "PUT",
+            {"name": "Updated Name", "description": "Updated description"},
+            {"name": "Updated Name", "description": "Updated description"},
+        ),
+        ("DELETE", None, None),
+    ])
+    async def test_project_lifecycle(self, async_client, created_project, verb, payload, expected):
+        """测试获取、更新、删除项目（expected 为 None 表示删除后应不存在）"""
+        item_url = url(PROJECTS, created_project)
+        response = await async_client.request(verb, item_url, json=payload)
         assert response.status_code == 200
-        data = response.json()
-        assert data["id"] == "tpl_initial_default"
-        assert data["type"] == "initial_task"
 
-    @pytest.mark.asyncio
-    async def test_get_template_not_found(self, async_client):
-        """测试获取不存在的模板"""
-        response = await async_client.get("/api/templates/nonexistent")
+        if expected is None:
+            get_response = await async_client.get(item_url)
+            assert get_response.status_code == 404
+        else:
+            data = response.json()
+            assert data["id"] == created_project
+            for key, value in expected.items():
+                assert data[key] == value
+
+
+class TestNotFoundAPI:
+    """测试访问不存在的项目/任务时返回 404"""
+
+    @pytest.mark.parametrize("method,path,payload", [
+        ("GET", url(PROJECTS, "nonexistent_id"), None),
+        ("POST", url(PROJECTS, "nonexistent_id", "launch"), None),
+        ("GET", url(TASKS, "nonexistent_id"), None),
+        ("PUT", url(TASKS, "nonexistent_id"), {"name": "Updated Name"}),
+        ("DELETE", url(TASKS, "nonexistent_id"), None),
+        ("POST", url(TASKS, "nonexistent_id", "start"), None),
+        ("POST", url(TASKS, "nonexistent_id", "complete"), None),
+        ("POST", url(TASKS, "nonexistent_id", "notify-status"), {"status": "in_progress", "message": "Test"}),
+    ])
+    async def test_not_found(self, async_client, method, path, payload):
+        """测试资源不存在"""
+        response = await async_client.request(method, path, json=payload)
         assert response.status_code == 404
 
-    @pytest.mark.asyncio
-    async def test_create_template(self, async_client):
-        """测试创建模板"""
-        template_data = {
-            "name": "Test Template",
-            "type": "custom",
-            "content": "Test content with {variable}",
-            "description": "A test template"
-        }
-        response = await async_client.post("/api/templates", json=template_data)
-        assert response.status_code == 200
-        data = response.json()
-        assert data["name"] == "Test Template"
-        assert data["type"] == "custom"
-
-    @pytest.mark.asyncio
-    async def test_update_template(self, async_client):
-        """测试更新模板"""
-        # 先创建模板
-        template_data = {
-            "name": "Update Template Test",
-            "type": "update_test",
-            "content": "Original content"
-        }
-        create_response = await async_client.post("/api/templates", json=template_data)
-        template_id = create_response.json()["id"]
-
-        # 更新模板
-        update_data = {"name": "Updated Template", "content": "Updated content"}
-        response = await async_client.put(f"/api/templates/{template_id}", json=update_data)
-        assert response.status_code == 200
-        data = response.json()
-        assert data["name"] == "Updated Template"
-        assert data["content"] == "Updated content"
-
-    @pytest.mark.asyncio
-    async def test_delete_template(self, async_client):
-        """测试删除模板"""
-        # 先创建模板
-        template_data = {
-            "name": "Delete Template Test",
-            "type": "delete_test",
-            "content": "To be deleted"
-        }
-        create_response = await async_client.post("/api/templates", json=template_data)
-        template_id = create_response.json()["id"]
-
-        # 删除模板
-        response = await async_client.delete(f"/api/templates/{template_id}")
-        assert response.status_code == 200
-
-        # 验证已删除
-        get_response = await async_client.get(f"/api/templates/{template_id}")
-        assert get_response.status_code == 404
-
-    @pytest.mark.asyncio
-    async def test_render_template(self, async_client):
-        """测试渲染模板"""
-        render_data = {
-            "type": "initial_task",
-            "locale": "zh",
-            "variables": {
-                "project_dir": "/tmp/project",
-                "doc_path": "/tmp/project/TODO.md",
-                "task_id": "task_123",
-                "api_base_url": "http://localhost:8086"
-            }
-        }
-        response = await async_client.post("/api/templates/render", json=render_data)
-        assert response.status_code == 200
-        data = response.json()
-        assert "content" in data
-        assert "/tmp/project" in data["content"]
-        assert "task_123" in data["content"]
-
 
 class TestSettingsAPI:
     """测试设置 API"""
 
-    @pytest.mark.asyncio
-    async def test_get_all_settings(self, async_client):
-        """测试获取所有设置"""
-        response = await async_client.get("/api/settings")
-        assert response.status_code == 200
-        data = response.json()
+    async def test_read_only_settings_endpoints(self, async_client):
+        """测试获取所有设置、可用终端列表和可用 CLI 工具列表（并发请求）"""
+        settings_response, terminals_response, cli_response = await asyncio.gather(
+            async_client.get(SETTINGS),
+            async_client.get(url(SETTINGS, "terminal", "available")),
+            async_client.get(url(SETTINGS, "cli", "available")),
+        )
+
+        assert settings_response.status_code == 200
+        data = settings_response.json()
         assert "settings" in data
         settings = data["settings"]
         assert "terminal" in settings
         assert "default_cli" in settings
 
-    @pytest.mark.asyncio
+        assert terminals_response.status_code == 200
+        data = terminals_response.json()
+        assert "terminals" in data
+        assert "current" in data
+        assert "platform" in data
+
+        # auto 应该总是可用
+        terminals = data["terminals"]
+        auto_terminal = next((t for t in terminals if t["id"] == "auto"), None)
+        assert auto_terminal is not None
+        assert auto_terminal["installed"] is True
+
+        assert cli_response.status_code == 200
+        data = cli_response.json()
+        assert "cli_tools" in data
+        assert "current" in data
+
+        # 检查 CLI 工具列表
+        cli_tools = data["cli_tools"]
+        assert len(cli_tools) >= 3  # claude_code, codex, gemini
+
     async def test_get_setting(self, async_client):
         """测试获取单个设置"""
-        response = await async_client.get("/api/settings/terminal")
+        response = await async_client.get(url(SETTINGS, "terminal"))
         assert response.status_code == 200
         data = response.json()
         assert data["key"] == "terminal"
         assert "value" in data
 
-    @pytest.mark.asyncio
     async def test_get_setting_not_found(self, async_client):
         """测试获取不存在的设置"""
-        response = await async_client.get("/api/settings/nonexistent_setting")
+        response = await async_client.get(url(SETTINGS, "nonexistent_setting"))
         assert response.status_code == 404
 
-    @pytest.mark.asyncio
     async def test_update_setting(self, async_client):
         """测试更新设置"""
         response = await async_client.put(
-            "/api/settings/language",
+            url(SETTINGS, "language"),
             json={"value": "en"}
         )
         assert response.status_code == 200
@@ -272,121 +181,55 @@ class TestSettingsAPI:
         assert data["success"] is True
         assert data["value"] == "en"
 
-        # 恢复默认值
-        await async_client.put("/api/settings/language", json={"value": "zh"})
-
-    @pytest.mark.asyncio
     async def test_update_setting_invalid_cli(self, async_client):
         """测试设置无效 CLI 类型"""
         response = await async_client.put(
-            "/api/settings/default_cli",
+            url(SETTINGS, "default_cli"),
             json={"value": "invalid_cli"}
         )
         assert response.status_code == 400
 
-    @pytest.mark.asyncio
-    async def test_get_available_terminals(self, async_client):
-        """测试获取可用终端列表"""
-        response = await async_client.get("/api/settings/terminal/available")
-        assert response.status_code == 200
-        data = response.json()
-        assert "terminals" in data
-        assert "current" in data
-        assert "platform" in data
-
-        # auto 应该总是可用
-        terminals = data["terminals"]
-        auto_terminal = next((t for t in terminals if t["id"] == "auto"), None)
-        assert auto_terminal is not None
-        assert auto_terminal["installed"] is True
-
-    @pytest.mark.asyncio
-    async def test_get_available_cli_tools(self, async_client):
-        """测试获取可用 CLI 工具列表"""
-        response = await async_client.get("/api/settings/cli/available")
-        assert response.status_code == 200
-        data = response.json()
-        assert "cli_tools" in data
-        assert "current" in data
-
-        # 检查 CLI 工具列表
-        cli_tools = data["cli_tools"]
-        assert len(cli_tools) >= 3  # claude_code, codex, gemini
-
 
 class TestTasksAPI:
     """测试任务 API"""
 
-    @pytest.mark.asyncio
-    async def test_get_all_tasks_empty(self, async_client):
-        """测试获取空任务列表"""
-        response = await async_client.get("/api/tasks")
-        assert response.status_code == 200
+    async def test_read_only_task_list_endpoints(self, async_client):
+        """测试获取任务列表、分页任务列表和待处理任务（并发请求）"""
+        all_response, page_response, pending_response = await asyncio.gather(
+            async_client.get(TASKS),
+            async_client.get(TASKS + "?page=1&page_size=10"),
+            async_client.get(url(TASKS, "pending")),
+        )
+
+        assert all_response.status_code == 200
         # 可能是列表或分页对象
-        data = response.json()
-        assert isinstance(data, (list, dict))
+        assert isinstance(all_response.json(), (list, dict))
 
-    @pytest.mark.asyncio
-    async def test_get_all_tasks_with_pagination(self, async_client):
-        """测试带分页的任务列表"""
-        response = await async_client.get("/api/tasks?page=1&page_size=10")
-        assert response.status_code == 200
-        data = response.json()
+        assert page_response.status_code == 200
+        data = page_response.json()
         if isinstance(data, dict):
             assert "tasks" in data
             assert "pagination" in data
 
-    @pytest.mark.asyncio
-    async def test_get_pending_tasks(self, async_client):
-        """测试获取待处理任务"""
-        response = await async_client.get("/api/tasks/pending")
-        assert response.status_code == 200
-        assert isinstance(response.json(), list)
-
-    @pytest.mark.asyncio
-    async def test_get_task_not_found(self, async_client):
-        """测试获取不存在的任务"""
-        response = await async_client.get("/api/tasks/nonexistent_id")
-        assert response.status_code == 404
+        assert pending_response.status_code == 200
+        assert isinstance(pending_response.json(), list)
 
-    @pytest.mark.asyncio
-    async def test_create_task(self, async_client):
+    async def test_create_task(self, async_client, project_factory):
         """测试创建任务"""
-        import tempfile
-        import os
-
-        # 创建临时目录和文件
-        temp_dir = tempfile.mkdtemp()
-        doc_path = os.path.join(temp_dir, "TODO.md")
-        with open(doc_path, 'w') as f:
-            f.write("# Tasks\n\n- [ ] Task 1\n")
-
-        try:
-            # 先创建项目
-            project_data = {
-                "name": "Task Test Project",
-                "directory_path": temp_dir
-            }
-            project_response = await async_client.post("/api/projects", json=project_data)
-            assert project_response.status_code == 200
-            project_id = project_response.json()["id"]
-
-            # 创建任务
-            task_data = {
-                "project_id": project_id,
-                "markdown_document_relative_path": "/TODO.md",
-                "cli_type": "claude_code"
-            }
-            response = await async_client.post("/api/tasks", json=task_data)
-            assert response.status_code == 200
-            data = response.json()
-            assert data["status"] == "pending"
-            assert "id" in data
-        finally:
-            os.unlink(doc_path)
-            os.rmdir(temp_dir)
+        project_id = await project_factory(name="Task Test Project")
+
+        # 创建任务
+        task_data = {
+            "project_id": project_id,
+            "markdown_document_relative_path": "/TODO.md",
+            "cli_type": "claude_code"
+        }
+        response = await async_client.post(TASKS, json=task_data)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "pending"
+        assert "id" in data
 
-    @pytest.mark.asyncio
     async def test_create_task_invalid_project(self, async_client):
         """测试创建任务时项目不存在"""
         task_data = {
@@ -394,357 +237,99 @@ class TestTasksAPI:
             "markdown_document_relative_path": "/TODO.md",
             "cli_type": "claude_code"
         }
-        response = await async_client.post("/api/tasks", json=task_data)
+        response = await async_client.post(TASKS, json=task_data)
         # 项目不存在应该返回 400 或 404
         assert response.status_code in [400, 404, 500]
 
-    @pytest.mark.asyncio
-    async def test_get_task(self, async_client):
-        """测试获取任务"""
-        import tempfile
-        import os
-
-        # 创建临时目录和文件
-        temp_dir = tempfile.mkdtemp()
-        doc_path = os.path.join(temp_dir, "TODO.md")
-        with open(doc_path, 'w') as f:
-            f.write("# Tasks\n\n- [ ] Task 1\n")
-
-        try:
-            # 先创建项目
-            project_data = {
-                "name": "Get Task Test Project",
-                "directory_path": temp_dir
-            }
-            project_response = await async_client.post("/api/projects", json=project_data)
-            assert project_response.status_code == 200
-            project_id = project_response.json()["id"]
-
-            # 创建任务
-            task_data = {
-                "project_id": project_id,
-                "markdown_document_relative_path": "/TODO.md",
-                "cli_type": "claude_code"
-            }
-            create_response = await async_client.post("/api/tasks", json=task_data)
-            assert create_response.status_code == 200
-            task_id = create_response.json()["id"]
-
-            # 获取任务
-            response = await async_client.get(f"/api/tasks/{task_id}")
-            assert response.status_code == 200
-            data = response.json()
-            assert data["id"] == task_id
-        finally:
-            os.unlink(doc_path)
-            os.rmdir(temp_dir)
-
-    @pytest.mark.asyncio
-    async def test_update_task(self, async_client):
-        """测试更新任务"""
-        import tempfile
-        import os
-
-        # 创建临时目录和文件
-        temp_dir = tempfile.mkdtemp()
-        doc_path = os.path.join(temp_dir, "TODO.md")
-        with open(doc_path, 'w') as f:
-            f.write("# Tasks\n\n- [ ] Task 1\n")
-
-        try:
-            # 先创建项目
-            project_data = {
-                "name": "Update Task Test Project",
-                "directory_path": temp_dir
-            }
-            project_response = await async_client.post("/api/projects", json=project_data)
-            assert project_response.status_code == 200
-            project_id = project_response.json()["id"]
-
-            # 创建任务
-            task_data = {
-                "project_id": project_id,
-                "markdown_document_relative_path": "/TODO.md",
-                "cli_type": "claude_code"
-            }
-            create_response = await async_client.post("/api/tasks", json=task_data)
-            assert create_response.status_code == 200
-            task_id = create_response.json()["id"]
-
-            # 更新任务
-            update_data = {
-                "cli_type": "codex"
-            }
-            response = await async_client.put(f"/api/tasks/{task_id}", json=update_data)
-            assert response.status_code == 200
-            data = response.json()
-            assert data["cli_type"] == "codex"
-        finally:
-            os.unlink(doc_path)
-            os.rmdir(temp_dir)
-
-    @pytest.mark.asyncio
-    async def test_update_task_not_found(self, async_client):
-        """测试更新不存在的任务"""
-        update_data = {"name": "Updated Name"}
-        response = await async_client.put("/api/tasks/nonexistent_id", json=update_data)
-        assert response.status_code == 404
-
-    @pytest.mark.asyncio
-    async def test_delete_task(self, async_client):
-        """测试删除任务"""
-        import tempfile
-        import os
-
-        # 创建临时目录和文件
-        temp_dir = tempfile.mkdtemp()
-        doc_path = os.path.join(temp_dir, "TODO.md")
-        with open(doc_path, 'w') as f:
-            f.write("# Tasks\n\n- [ ] Task 1\n")
-
-        try:
-            # 先创建项目
-            project_data = {
-                "name": "Delete Task Test Project",
-                "directory_path": temp_dir
-            }
-            project_response = await async_client.post("/api/projects", json=project_data)
-            assert project_response.status_code == 200
-            project_id = project_response.json()["id"]
-
-            # 创建任务
-            task_data = {
-                "project_id": project_id,
-                "markdown_document_relative_path": "/TODO.md",
-                "cli_type": "claude_code"
-            }
-            create_response = await async_client.post("/api/tasks", json=task_data)
-            assert create_response.status_code == 200
-            task_id = create_response.json()["id"]
+    @pytest.mark.parametrize("verb,payload,expected", [
+        ("GET", None, {"status": "pending"}),
+        ("PUT", {"cli_type": "codex"}, {"cli_type": "codex"}),
+        ("DELETE", None, None),
+    ])
+    async def test_task_lifecycle(self, async_client, created_task, verb, payload, expected):
+        """测试获取、更新、删除任务（expected 为 None 表示删除后应不存在）"""
+        item_url = url(TASKS, created_task)
+        response = await async_client.request(verb, item_url, json=payload)
+        assert response.status_code == 200
+        data = response.json()
 
-            # 删除任务
-            response = await async_client.delete(f"/api/tasks/{task_id}")
-            assert response.status_code == 200
-            data = response.json()
+        if expected is None:
             assert data["success"] is True
-
-            # 验证已删除
-            get_response = await async_client.get(f"/api/tasks/{task_id}")
+            get_response = await async_client.get(item_url)
             assert get_response.status_code == 404
-        finally:
-            os.unlink(doc_path)
-            os.rmdir(temp_dir)
-
-    @pytest.mark.asyncio
-    async def test_delete_task_not_found(self, async_client):
-        """测试删除不存在的任务"""
-        response = await async_client.delete("/api/tasks/nonexistent_id")
-        assert response.status_code == 404
+        else:
+            assert data["id"] == created_task
+            for key, value in expected.items():
+                assert data[key] == value
 
-    @pytest.mark.asyncio
-    async def test_start_task_not_found(self, async_client):
-        """测试启动不存在的任务"""
-        response = await async_client.post("/api/tasks/nonexistent_id/start")
-        assert response.status_code == 404
-
-    @pytest.mark.asyncio
-    async def test_complete_task_not_found(self, async_client):
-        """测试完成不存在的任务"""
-        response = await async_client.post("/api/tasks/nonexistent_id/complete")
-        assert response.status_code == 404
-
-    @pytest.mark.asyncio
-    async def test_task_logs(self, async_client):
+    async def test_task_logs(self, async_client, created_task):
         """测试获取任务日志"""
-        import tempfile
-        import os
-
-        # 创建临时目录和文件
-        temp_dir = tempfile.mkdtemp()
-        doc_path = os.path.join(temp_dir, "TODO.md")
-        with open(doc_path, 'w') as f:
-            f.write("# Tasks\n\n- [ ] Task 1\n")
-
-        try:
-            # 先创建项目
-            project_data = {
-                "name": "Logs Task Test Project",
-                "directory_path": temp_dir
-            }
-            project_response = await async_client.post("/api/projects", json=project_data)
-            assert project_response.status_code == 200
-            project_id = project_response.json()["id"]
-
-            # 创建任务
-            task_data = {
-                "project_id": project_id,
-                "markdown_document_relative_path": "/TODO.md",
-                "cli_type": "claude_code"
-            }
-            create_response = await async_client.post("/api/tasks", json=task_data)
-            assert create_response.status_code == 200
-            task_id = create_response.json()["id"]
+        task_id = created_task
 
-            # 获取任务日志
-            response = await async_client.get(f"/api/tasks/{task_id}/logs")
-            assert response.status_code == 200
-            data = response.json()
-            assert "logs" in data
-            assert isinstance(data["logs"], list)
-        finally:
-            os.unlink(doc_path)
-            os.rmdir(temp_dir)
-
-    @pytest.mark.asyncio
-    async def test_notify_task_status(self, async_client):
+        # 获取任务日志
+        response = await async_client.get(url(TASKS, task_id, "logs"))
+        assert response.status_code == 200
+        data = response.json()
+        assert "logs" in data
+        assert isinstance(data["logs"], list)
+
+    async def test_notify_task_status(self, async_client, created_task):
         """测试任务状态通知"""
-        import tempfile
-        import os
-
-        # 创建临时目录和文件
-        temp_dir = tempfile.mkdtemp()
-        doc_path = os.path.join(temp_dir, "TODO.md")
-        with open(doc_path, 'w') as f:
-            f.write("# Tasks\n\n- [ ] Task 1\n")
-
-        try:
-            # 先创建项目
-            project_data = {
-                "name": "Notify Status Test Project",
-                "directory_path": temp_dir
-            }
-            project_response = await async_client.post("/api/projects", json=project_data)
-            assert project_response.status_code == 200
-            project_id = project_response.json()["id"]
-
-            # 创建任务
-            task_data = {
-                "project_id": project_id,
-                "markdown_document_relative_path": "/TODO.md",
-                "cli_type": "claude_code"
-            }
-            create_response = await async_client.post("/api/tasks", json=task_data)
-            assert create_response.status_code == 200
-            task_id = create_response.json()["id"]
-
-            # 发送状态通知（使用 failed 状态以避免触发复杂的自动流程）
-            notify_data = {
-                "status": "failed",
-                "error": "Test failure"
-            }
-            response = await async_client.post(f"/api/tasks/{task_id}/notify-status", json=notify_data)
-            assert response.status_code == 200
-            data = response.json()
-            assert data["success"] is True
-        finally:
-            os.unlink(doc_path)
-            os.rmdir(temp_dir)
+        task_id = created_task
 
-    @pytest.mark.asyncio
-    async def test_notify_task_status_not_found(self, async_client):
-        """测试通知不存在任务的状态"""
+        # 发送状态通知（使用 failed 状态以避免触发复杂的自动流程）
         notify_data = {
-            "status": "in_progress",
-            "message": "Test"
+            "status": "failed",
+            "error": "Test failure"
         }
-        response = await async_client.post("/api/tasks/nonexistent_id/notify-status", json=notify_data)
-        assert response.status_code == 404
+        response = await async_client.post(url(TASKS, task_id, "notify-status"), json=notify_data)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success"] is True
 
-    @pytest.mark.asyncio
-    async def test_notify_task_status_invalid_status(self, async_client):
+    async def test_notify_task_status_invalid_status(self, async_client, created_task):
         """测试通知无效状态"""
-        import tempfile
-        import os
-
-        # 创建临时目录和文件
-        temp_dir = tempfile.mkdtemp()
-        doc_path = os.path.join(temp_dir, "TODO.md")
-        with open(doc_path, 'w') as f:
-            f.write("# Tasks\n\n- [ ] Task 1\n")
-
-        try:
-            # 先创建项目
-            project_data = {
-                "name": "Invalid Status Test Project",
-                "directory_path": temp_dir
-            }
-            project_response = await async_client.post("/api/projects", json=project_data)
-            assert project_response.status_code == 200
-            project_id = project_response.json()["id"]
-
-            # 创建任务
-            task_data = {
-                "project_id": project_id,
-                "markdown_document_relative_path": "/TODO.md",
-                "cli_type": "claude_code"
-            }
-            create_response = await async_client.post("/api/tasks", json=task_data)
-            assert create_response.status_code == 200
-            task_id = create_response.json()["id"]
+        task_id = created_task
 
-            # 发送无效状态
-            notify_data = {
-                "status": "invalid_status"
-            }
-            response = await async_client.post(f"/api/tasks/{task_id}/notify-status", json=notify_data)
-            assert response.status_code == 400
-        finally:
-            os.unlink(doc_path)
-            os.rmdir(temp_dir)
-
-    @pytest.mark.asyncio
-    async def test_notify_task_status_missing_status(self, async_client):
+        # 发送无效状态
+        notify_data = {
+            "status": "invalid_status"
+        }
+        response = await async_client.post(url(TASKS, task_id, "notify-status"), json=notify_data)
+        assert response.status_code == 400
+
+    async def test_notify_task_status_missing_status(self, async_client, created_task):
         """测试缺少状态字段"""
-        import tempfile
-        import os
-
-        # 创建临时目录和文件
-        temp_dir = tempfile.mkdtemp()
-        doc_path = os.path.join(temp_dir, "TODO.md")
-        with open(doc_path, 'w') as f:
-            f.write("# Tasks\n\n- [ ] Task 1\n")
-
-        try:
-            # 先创建项目
-            project_data = {
-                "name": "Missing Status Test Project",
-                "directory_path": temp_dir
-            }
-            project_response = await async_client.post("/api/projects", json=project_data)
-            assert project_response.status_code == 200
-            project_id = project_response.json()["id"]
-
-            # 创建任务
-            task_data = {
-                "project_id": project_id,
-                "markdown_document_relative_path": "/TODO.md",
-                "cli_type": "claude_code"
-            }
-            create_response = await async_client.post("/api/tasks", json=task_data)
-            assert create_response.status_code == 200
-            task_id = create_response.json()["id"]
+        task_id = created_task
 
-            # 发送没有状态字段的请求
-            notify_data = {
-                "message": "No status"
-            }
-            response = await async_client.post(f"/api/tasks/{task_id}/notify-status", json=notify_data)
-            assert response.status_code == 400
-        finally:
-            os.unlink(doc_path)
-            os.rmdir(temp_dir)
+        # 发送没有状态字段的请求
+        notify_data = {
+            "message": "No status"
+        }
+        response = await async_client.post(url(TASKS, task_id, "notify-status"), json=notify_data)
+        assert response.status_code == 400
+
+
+@pytest.fixture(scope="module")
+def launch_dir(tmp_path_factory) -> str:
+    """启动测试共用的项目目录（每个测试使用独立数据库，项目之间互不影响）"""
+    return str(tmp_path_factory.mktemp("launch_projects"))
+
+
+@pytest_asyncio.fixture(loop_scope="module")
+async def launch_project_id(test_app, launch_dir) -> str:
+    """直接通过服务层创建启动测试用的项目（路由本身由 test_launch_project_success 覆盖）"""
+    import backend.app as app_module
+
+    project = await app_module.project_service.create_project(
+        ProjectCreateRequest(name="Launch Test", directory_path=launch_dir)
+    )
+    return project.id
 
 
 class TestProjectLaunchAPI:
     """测试项目启动 API"""
 
-    @pytest.mark.asyncio
-    async def test_launch_project_not_found(self, async_client):
-        """测试启动不存在的项目"""
-        response = await async_client.post("/api/projects/nonexistent_id/launch")
-        assert response.status_code == 404
-
-    @pytest.mark.asyncio
     async def test_launch_project_directory_not_exist(self, async_client):
         """测试启动项目但目录不存在"""
         # 创建项目但使用不存在的目录
@@ -752,281 +337,95 @@ class TestProjectLaunchAPI:
             "name": "Launch Test Project",
             "directory_path": "/nonexistent/path/to/project"
         }
-        create_response = await async_client.post("/api/projects", json=project_data)
+        create_response = await async_client.post(PROJECTS, json=project_data)
         assert create_response.status_code == 200, f"Failed to create project: {create_response.json()}"
         project_id = create_response.json()["id"]
 
         # 启动项目
-        response = await async_client.post(f"/api/projects/{project_id}/launch")
+        response = await async_client.post(url(PROJECTS, project_id, "launch"))
         assert response.status_code == 400
         assert "does not exist" in response.json()["detail"]
 
-    @pytest.mark.asyncio
-    async def test_launch_project_success(self, async_client, monkeypatch):
+    async def test_launch_project_success(self, async_client, mock_terminal_adapter, launch_dir):
         """测试成功启动项目"""
-        import tempfile
-        import os
-
-        # 创建临时目录
-        temp_dir = tempfile.mkdtemp()
-        try:
-            # 创建项目
-            project_data = {
-                "name": "Launch Success Test",
-                "directory_path": temp_dir
-            }
-            create_response = await async_client.post("/api/projects", json=project_data)
-            assert create_response.status_code == 200, f"Failed to create project: {create_response.json()}"
-            project_id = create_response.json()["id"]
-
-            # Mock 终端适配器
-            mock_session = MagicMock()
-            mock_session.session_id = "test_session_123"
-
-            mock_adapter = MagicMock()
-            mock_adapter.create_window = AsyncMock(return_value=mock_session)
-
-            # 获取 codex_service 并 mock
-            from backend.services.codex_service import CodexService
-
-            async def mock_get_terminal_adapter(self, terminal_type=None):
-                return mock_adapter
-
-            monkeypatch.setattr(CodexService, "get_terminal_adapter", mock_get_terminal_adapter)
-
-            # 启动项目
-            response = await async_client.post(f"/api/projects/{project_id}/launch")
-            assert response.status_code == 200
-            data = response.json()
-            assert data["success"] is True
-            assert "session_id" in data
-            assert data["project_directory"] == temp_dir
+        # 创建项目
+        project_data = {
+            "name": "Launch Success Test",
+            "directory_path": launch_dir
+        }
+        create_response = await async_client.post(PROJECTS, json=project_data)
+        assert create_response.status_code == 200, f"Failed to create project: {create_response.json()}"
+        project_id = create_response.json()["id"]
 
-        finally:
-            # 清理
-            if os.path.exists(temp_dir):
-                os.rmdir(temp_dir)
+        # 启动项目
+        response = await async_client.post(url(PROJECTS, project_id, "launch"))
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success"] is True
+        assert "session_id" in data
+        assert data["project_directory"] == launch_dir
 
-    @pytest.mark.asyncio
-    async def test_launch_project_terminal_mode(self, async_client, monkeypatch):
+    async def test_launch_project_terminal_mode(self, async_client, mock_terminal_adapter, launch_project_id):
         """测试仅打开终端模式"""
-        import tempfile
-        import os
-
-        # 创建临时目录
-        temp_dir = tempfile.mkdtemp()
-        try:
-            # 创建项目
-            project_data = {
-                "name": "Terminal Mode Test",
-                "directory_path": temp_dir
-            }
-            create_response = await async_client.post("/api/projects", json=project_data)
-            assert create_response.status_code == 200, f"Failed to create project: {create_response.json()}"
-            project_id = create_response.json()["id"]
-
-            # Mock 终端适配器
-            mock_session = MagicMock()
-            mock_session.session_id = "test_session_456"
-
-            mock_adapter = MagicMock()
-            mock_adapter.create_window = AsyncMock(return_value=mock_session)
-
-            from backend.services.codex_service import CodexService
-
-            async def mock_get_terminal_adapter(self, terminal_type=None):
-                return mock_adapter
-
-            monkeypatch.setattr(CodexService, "get_terminal_adapter", mock_get_terminal_adapter)
-
-            # 启动项目（仅终端模式）
-            response = await async_client.post(
-                f"/api/projects/{project_id}/launch",
-                json={"mode": "terminal"}
-            )
-            assert response.status_code == 200
-            data = response.json()
-            assert data["success"] is True
-            assert data["command"] == "(none)"
-
-        finally:
-            if os.path.exists(temp_dir):
-                os.rmdir(temp_dir)
+        # 启动项目（仅终端模式）
+        response = await async_client.post(
+            url(PROJECTS, launch_project_id, "launch"),
+            json={"mode": "terminal"}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success"] is True
+        assert data["command"] == "(none)"
 
-    @pytest.mark.asyncio
-    async def test_launch_project_with_custom_command(self, async_client, monkeypatch):
+    async def test_launch_project_with_custom_command(self, async_client, mock_terminal_adapter, launch_project_id):
         """测试使用自定义命令启动项目"""
-        import tempfile
-        import os
-
-        # 创建临时目录
-        temp_dir = tempfile.mkdtemp()
-        try:
-            # 创建项目
-            project_data = {
-                "name": "Custom Command Test",
-                "directory_path": temp_dir
-            }
-            create_response = await async_client.post("/api/projects", json=project_data)
-            assert create_response.status_code == 200, f"Failed to create project: {create_response.json()}"
-            project_id = create_response.json()["id"]
-
-            # Mock 终端适配器
-            mock_session = MagicMock()
-            mock_session.session_id = "test_session_789"
-
-            mock_adapter = MagicMock()
-            mock_adapter.create_window = AsyncMock(return_value=mock_session)
-
-            from backend.services.codex_service import CodexService
-
-            async def mock_get_terminal_adapter(self, terminal_type=None):
-                return mock_adapter
-
-            monkeypatch.setattr(CodexService, "get_terminal_adapter", mock_get_terminal_adapter)
-
-            # 启动项目（自定义命令）
-            response = await async_client.post(
-                f"/api/projects/{project_id}/launch",
-                json={"command": "npm run dev"}
-            )
-            assert response.status_code == 200
-            data = response.json()
-            assert data["success"] is True
-            assert data["command"] == "npm run dev"
-
-        finally:
-            if os.path.exists(temp_dir):
-                os.rmdir(temp_dir)
+        # 启动项目（自定义命令）
+        response = await async_client.post(
+            url(PROJECTS, launch_project_id, "launch"),
+            json={"command": "npm run dev"}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success"] is True
+        assert data["command"] == "npm run dev"
 
-    @pytest.mark.asyncio
-    async def test_launch_project_with_dangerous_mode(self, async_client, monkeypatch):
+    async def test_launch_project_with_dangerous_mode(self, async_client, mock_terminal_adapter, launch_project_id):
         """测试危险模式启动项目"""
-        import tempfile
-        import os
-
-        # 创建临时目录
-        temp_dir = tempfile.mkdtemp()
-        try:
-            # 创建项目
-            project_data = {
-                "name": "Dangerous Mode Test",
-                "directory_path": temp_dir
-            }
-            create_response = await async_client.post("/api/projects", json=project_data)
-            assert create_response.status_code == 200, f"Failed to create project: {create_response.json()}"
-            project_id = create_response.json()["id"]
-
-            # Mock 终端适配器
-            mock_session = MagicMock()
-            mock_session.session_id = "test_session_danger"
-
-            mock_adapter = MagicMock()
-            mock_adapter.create_window = AsyncMock(return_value=mock_session)
-
-            from backend.services.codex_service import CodexService
-
-            async def mock_get_terminal_adapter(self, terminal_type=None):
-                return mock_adapter
-
-            monkeypatch.setattr(CodexService, "get_terminal_adapter", mock_get_terminal_adapter)
-
-            # 启动项目（危险模式）
-            response = await async_client.post(
-                f"/api/projects/{project_id}/launch",
-                json={"dangerousMode": True}
-            )
-            assert response.status_code == 200
-            data = response.json()
-            assert data["success"] is True
-            # 命令应该包含危险模式标志
-            assert "--dangerously-skip-permissions" in data["command"] or "claude" in data["command"]
-
-        finally:
-            if os.path.exists(temp_dir):
-                os.rmdir(temp_dir)
+        # 启动项目（危险模式）
+        response = await async_client.post(
+            url(PROJECTS, launch_project_id, "launch"),
+            json={"dangerousMode": True}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success"] is True
+        # 命令应该包含危险模式标志
+        assert "--dangerously-skip-permissions" in data["command"] or "claude" in data["command"]
 
-    @pytest.mark.asyncio
-    async def test_launch_project_no_terminal_adapter(self, async_client, monkeypatch):
+    async def test_launch_project_no_terminal_adapter(self, async_client, no_terminal_adapter, launch_project_id):
         """测试没有可用终端适配器"""
-        import tempfile
-        import os
-
-        # 创建临时目录
-        temp_dir = tempfile.mkdtemp()
-        try:
-            # 创建项目
-            project_data = {
-                "name": "No Adapter Test",
-                "directory_path": temp_dir
-            }
-            create_response = await async_client.post("/api/projects", json=project_data)
-            assert create_response.status_code == 200, f"Failed to create project: {create_response.json()}"
-            project_id = create_response.json()["id"]
-
-            # Mock 终端适配器返回 None
-            from backend.services.codex_service import CodexService
-
-            async def mock_get_terminal_adapter(self, terminal_type=None):
-                return None
-
-            monkeypatch.setattr(CodexService, "get_terminal_adapter", mock_get_terminal_adapter)
-
-            # 启动项目
-            response = await async_client.post(f"/api/projects/{project_id}/launch")
-            assert response.status_code == 500
-            assert "No terminal adapter" in response.json()["detail"]
-
-        finally:
-            if os.path.exists(temp_dir):
-                os.rmdir(temp_dir)
+        # 启动项目
+        response = await async_client.post(url(PROJECTS, launch_project_id, "launch"))
+        assert response.status_code == 500
+        assert "No terminal adapter" in response.json()["detail"]
 
-    @pytest.mark.asyncio
-    async def test_launch_project_create_window_failure(self, async_client, monkeypatch):
+    async def test_launch_project_create_window_failure(self, async_client, mock_terminal_adapter, launch_project_id):
         """测试创建终端窗口失败"""
-        import tempfile
-        import os
-
-        # 创建临时目录
-        temp_dir = tempfile.mkdtemp()
-        try:
-            # 创建项目
-            project_data = {
-                "name": "Window Failure Test",
-                "directory_path": temp_dir
-            }
-            create_response = await async_client.post("/api/projects", json=project_data)
-            assert create_response.status_code == 200, f"Failed to create project: {create_response.json()}"
-            project_id = create_response.json()["id"]
-
-            # Mock 终端适配器返回 None (创建窗口失败)
-            mock_adapter = MagicMock()
-            mock_adapter.create_window = AsyncMock(return_value=None)
+        # 创建窗口失败
+        mock_terminal_adapter.create_window.return_value = None
 
-            from backend.services.codex_service import CodexService
-
-            async def mock_get_terminal_adapter(self, terminal_type=None):
-                return mock_adapter
-
-            monkeypatch.setattr(CodexService, "get_terminal_adapter", mock_get_terminal_adapter)
-
-            # 启动项目
-            response = await async_client.post(f"/api/projects/{project_id}/launch")
-            assert response.status_code == 500
-            assert "Failed to create terminal window" in response.json()["detail"]
-
-        finally:
-            if os.path.exists(temp_dir):
-                os.rmdir(temp_dir)
+        # 启动项目
+        response = await async_client.post(url(PROJECTS, launch_project_id, "launch"))
+        assert response.status_code == 500
+        assert "Failed to create terminal window" in response.json()["detail"]
 
 
 class TestSessionsAPI:
     """测试会话 API"""
 
-    @pytest.mark.asyncio
     async def test_get_all_sessions(self, async_client):
         """测试获取所有会话"""
-        response = await async_client.get("/api/sessions")
+        response = await async_client.get(SESSIONS)
         assert response.status_code == 200
         data = response.json()
         assert "sessions" in data
@@ -1034,40 +433,34 @@ class TestSessionsAPI:
         assert "active" in data
         assert "max_concurrent" in data
 
-    @pytest.mark.asyncio
     async def test_get_active_sessions(self, async_client):
         """测试获取活跃会话"""
-        response = await async_client.get("/api/sessions/active")
+        response = await async_client.get(url(SESSIONS, "active"))
         assert response.status_code == 200
         data = response.json()
         assert "sessions" in data
         assert "count" in data
         assert isinstance(data["sessions"], list)
 
-    @pytest.mark.asyncio
     async def test_get_session_status_not_found(self, async_client):
         """测试获取不存在的会话状态"""
-        response = await async_client.get("/api/sessions/nonexistent_id")
+        response = await async_client.get(url(SESSIONS, "nonexistent_id"))
         assert response.status_code == 404
 
-    @pytest.mark.asyncio
     async def test_remove_session_not_found(self, async_client):
         """测试移除不存在的会话"""
-        response = await async_client.delete("/api/sessions/nonexistent_id")
+        response = await async_client.delete(url(SESSIONS, "nonexistent_id"))
         assert response.status_code == 404
 
-    @pytest.mark.asyncio
     async def test_stop_all_sessions(self, async_client, monkeypatch):
         """测试停止所有会话"""
         # Mock stop_all_sessions 以避免影响真实会话
-        from backend.services.codex_service import CodexService
-
         async def mock_stop_all_sessions(self):
             pass  # 不执行实际操作
 
         monkeypatch.setattr(CodexService, "stop_all_sessions", mock_stop_all_sessions)
 
-        response = await async_client.post("/api/sessions/stop-all")
+        response = await async_client.post(url(SESSIONS, "stop-all"))
         assert response.status_code == 200
         data = response.json()
         assert data["success"] is True
@@ -1076,29 +469,38 @@ class TestSessionsAPI:
 class TestTemplatesAPI:
     """测试模板 API"""
 
-    @pytest.mark.asyncio
     async def test_get_all_templates(self, async_client):
         """测试获取所有模板"""
-        response = await async_client.get("/api/templates")
+        response = await async_client.get(TEMPLATES)
         assert response.status_code == 200
         templates = response.json()
         assert isinstance(templates, list)
+        # 种子数据库中已有默认模板
+        assert len(templates) >= 4
 
-    @pytest.mark.asyncio
     async def test_get_templates_by_type(self, async_client):
         """测试按类型获取模板"""
-        response = await async_client.get("/api/templates/type/initial_task")
+        response = await async_client.get(url(TEMPLATES, "type", "initial_task"))
         assert response.status_code == 200
         templates = response.json()
         assert isinstance(templates, list)
+        assert len(templates) >= 1
+        for t in templates:
+            assert t["type"] == "initial_task"
+
+    async def test_get_template(self, async_client):
+        """测试获取单个模板"""
+        response = await async_client.get(url(TEMPLATES, "tpl_initial_default"))
+        assert response.status_code == 200
+        data = response.json()
+        assert data["id"] == "tpl_initial_default"
+        assert data["type"] == "initial_task"
 
-    @pytest.mark.asyncio
     async def test_get_template_not_found(self, async_client):
         """测试获取不存在的模板"""
-        response = await async_client.get("/api/templates/nonexistent")
+        response = await async_client.get(url(TEMPLATES, "nonexistent"))
         assert response.status_code == 404
 
-    @pytest.mark.asyncio
     async def test_create_template(self, async_client):
         """测试创建模板"""
         template_data = {
@@ -1107,14 +509,13 @@ class TestTemplatesAPI:
             "content": "Test content with {variable}",
             "description": "A test template"
         }
-        response = await async_client.post("/api/templates", json=template_data)
+        response = await async_client.post(TEMPLATES, json=template_data)
         assert response.status_code == 200
         data = response.json()
         assert data["name"] == "Test Template"
         assert data["type"] == "custom"
         assert "id" in data
 
-    @pytest.mark.asyncio
     async def test_update_template(self, async_client):
         """测试更新模板"""
         # 先创建模板
@@ -1123,26 +524,24 @@ class TestTemplatesAPI:
             "type": "update_test",
             "content": "Original content"
         }
-        create_response = await async_client.post("/api/templates", json=template_data)
+        create_response = await async_client.post(TEMPLATES, json=template_data)
         assert create_response.status_code == 200
         template_id = create_response.json()["id"]
 
         # 更新模板
         update_data = {"name": "Updated Template", "content": "Updated content"}
-        response = await async_client.put(f"/api/templates/{template_id}", json=update_data)
+        response = await async_client.put(url(TEMPLATES, template_id), json=update_data)
         assert response.status_code == 200
         data = response.json()
         assert data["name"] == "Updated Template"
         assert data["content"] == "Updated content"
 
-    @pytest.mark.asyncio
     async def test_update_template_not_found(self, async_client):
         """测试更新不存在的模板"""
         update_data = {"name": "Updated Template"}
-        response = await async_client.put("/api/templates/nonexistent", json=update_data)
+        response = await async_client.put(url(TEMPLATES, "nonexistent"), json=update_data)
         assert response.status_code == 404
 
-    @pytest.mark.asyncio
     async def test_delete_template(self, async_client):
         """测试删除模板"""
         # 先创建模板
@@ -1151,61 +550,51 @@ class TestTemplatesAPI:
             "type": "delete_test",
             "content": "To be deleted"
         }
-        create_response = await async_client.post("/api/templates", json=template_data)
+        create_response = await async_client.post(TEMPLATES, json=template_data)
         assert create_response.status_code == 200
         template_id = create_response.json()["id"]
 
         # 删除模板
-        response = await async_client.delete(f"/api/templates/{template_id}")
+        response = await async_client.delete(url(TEMPLATES, template_id))
         assert response.status_code == 200
 
         # 验证已删除
-        get_response = await async_client.get(f"/api/templates/{template_id}")
+        get_response = await async_client.get(url(TEMPLATES, template_id))
         assert get_response.status_code == 404
 
-    @pytest.mark.asyncio
     async def test_delete_template_not_found(self, async_client):
         """测试删除不存在的模板"""
-        response = await async_client.delete("/api/templates/nonexistent")
+        response = await async_client.delete(url(TEMPLATES, "nonexistent"))
         assert response.status_code == 404
 
-    @pytest.mark.asyncio
     async def test_render_template(self, async_client):
         """测试渲染模板"""
-        # 使用已存在的默认模板类型进行渲染
-        # 先检查是否有 initial_task 类型的模板
-        get_response = await async_client.get("/api/templates/type/initial_task")
-        if get_response.status_code == 200 and len(get_response.json()) > 0:
-            # 使用 initial_task 模板进行渲染测试
-            render_data = {
-                "type": "initial_task",
-                "locale": "zh",
-                "variables": {
-                    "project_dir": "/tmp/project",
-                    "doc_path": "/tmp/project/TODO.md",
-                    "task_id": "task_123",
-                    "api_base_url": "http://localhost:8086"
-                }
+        render_data = {
+            "type": "initial_task",
+            "locale": "zh",
+            "variables": {
+                "project_dir": "/tmp/project",
+                "doc_path": "/tmp/project/TODO.md",
+                "task_id": "task_123",
+                "api_base_url": "http://localhost:8086"
             }
-            response = await async_client.post("/api/templates/render", json=render_data)
-            # 渲染可能成功或失败（取决于模板内容格式）
-            # 主要测试 API 端点是否正常工作
-            assert response.status_code in [200, 500]
-            if response.status_code == 200:
-                data = response.json()
-                assert "content" in data
-
-    @pytest.mark.asyncio
+        }
+        response = await async_client.post(url(TEMPLATES, "render"), json=render_data)
+        assert response.status_code == 200
+        data = response.json()
+        assert "content" in data
+        assert "/tmp/project" in data["content"]
+        assert "task_123" in data["content"]
+
     async def test_set_default_template_not_found(self, async_client):
         """测试设置不存在的模板为默认"""
-        response = await async_client.post("/api/templates/nonexistent/set-default")
+        response = await async_client.post(url(TEMPLATES, "nonexistent", "set-default"))
         assert response.status_code == 404
 
 
 class TestWebSocketAPI:
     """测试 WebSocket 相关功能（基础测试）"""
 
-    @pytest.mark.asyncio
     async def test_monitor_status(self, async_client):
         """测试监控状态 API"""
         response = await async_client.get("/api/monitor/status")
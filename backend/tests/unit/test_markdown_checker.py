@@ -2,13 +2,15 @@
 Markdown Checker Tests
 测试 Markdown 文档进度检查工具
 """
-import pytest
-import tempfile
 import os
+
+import pytest
 from pathlib import Path
+from unittest.mock import patch
 
 from backend.utils.markdown_checker import (
     check_remaining_tasks,
+    check_remaining_tasks_content,
     clear_cache,
     get_task_progress_summary,
     _is_optional_section_header,
@@ -38,6 +40,9 @@ class TestHelperFunctions:
         assert _is_optional_section_header("## Required Features") is False
         assert _is_optional_section_header("### Core Tasks") is False
         assert _is_optional_section_header("Normal text") is False
+        # 按 lower() 判断：ı (U+0131) / İ (U+0130) 不等同于 i
+        assert _is_optional_section_header("## optıonal") is False
+        assert _is_optional_section_header("## OPTİONAL") is False
 
     def test_is_optional_section_header_not_header(self):
         """测试非标题行"""
@@ -165,55 +170,92 @@ class TestParseTasksWithOptionalFilter:
         assert len(checked) == 3
 
 
-class TestCheckRemainingTasks:
-    """测试检查剩余任务"""
+@pytest.fixture(autouse=True)
+def _clear_markdown_cache():
+    """每个测试开始前清空解析缓存，避免测试之间互相影响"""
+    clear_cache()
+    yield
 
-    def test_check_remaining_tasks_with_file(self):
-        """测试从文件检查剩余任务"""
-        content = """
-# Test Plan
 
-- [x] Completed task 1
-- [ ] Pending task 1
-- [ ] Pending task 2
-"""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False) as f:
-            f.write(content)
-            temp_path = f.name
-
-        try:
-            clear_cache()  # 清除缓存
-            result = check_remaining_tasks(temp_path)
-
-            assert result["has_remaining"] is True
-            assert result["total"] == 3
-            assert result["completed"] == 1
-            assert result["remaining"] == 2
-            assert result["optional"] == 0
-            assert "error" not in result
-        finally:
-            os.unlink(temp_path)
-
-    def test_check_remaining_tasks_all_completed(self):
-        """测试所有任务已完成"""
-        content = """
-- [x] Task 1
-- [x] Task 2
-"""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False) as f:
-            f.write(content)
-            temp_path = f.name
+# 只读的文件场景，整个模块一次性写入；会修改文件的测试仍使用 md_file
+_FILE_SCENARIOS = {
+    "pending": "- [x] Completed task\n- [ ] Pending task\n",
+    "pending_copy": "- [x] Completed task\n- [ ] Pending task\n",
+    "pending_crlf": "- [x] Completed task\r\n- [ ] Pending task\r\n",
+    "completed": "- [x] Completed task\n",
+    "optional": "- [x] Done\n\n## Optional\n\n- [ ] Optional task\n",
+}
 
-        try:
-            clear_cache()
-            result = check_remaining_tasks(temp_path)
 
-            assert result["has_remaining"] is False
-            assert result["total"] == 2
-            assert result["completed"] == 2
-            assert result["remaining"] == 0
-        finally:
-            os.unlink(temp_path)
+@pytest.fixture(scope="module")
+def md_corpus(tmp_path_factory):
+    """一次写入所有只读场景文档，返回 {场景名: 路径}"""
+    base = tmp_path_factory.mktemp("md")
+    paths = {}
+    for name, content in _FILE_SCENARIOS.items():
+        path = base / f"{name}.md"
+        path.write_bytes(content.encode("utf-8"))
+        paths[name] = str(path)
+    return paths
+
+
+@pytest.fixture
+def md_file(tmp_path):
+    """在 tmp_path 下写入 markdown 文档并返回路径"""
+    def _make(content: str, name: str = "doc.md") -> str:
+        path = tmp_path / name
+        path.write_text(content, encoding="utf-8")
+        return str(path)
+    return _make
+
+
+class TestCheckRemainingTasks:
+    """测试检查剩余任务"""
+
+    @pytest.mark.parametrize("content,total,completed,remaining,optional", [
+        pytest.param(
+            "\n# Test Plan\n\n- [x] Completed task 1\n- [ ] Pending task 1\n- [ ] Pending task 2\n",
+            3, 1, 2, 0, id="pending"
+        ),
+        pytest.param("\n- [x] Task 1\n- [x] Task 2\n", 2, 2, 0, 0, id="all_completed"),
+        pytest.param(
+            "\n# Tasks\n\n- [x] Required done\n- [ ] Required pending\n\n"
+            "## 可选功能\n\n- [ ] Optional 1\n- [ ] Optional 2\n",
+            2, 1, 1, 2, id="optional_excluded"  # 只统计必选任务
+        ),
+        pytest.param("# Empty document\n\nNo tasks here.", 0, 0, 0, 0, id="no_tasks"),
+        pytest.param(
+            "\n## Optional\n\n- [ ] Extra\n# Core\n\n- [ ] Required\n- [ ] optional task\n",
+            1, 0, 1, 2, id="ascii_optional"  # 纯 ASCII 但含 optional，走逐行解析
+        ),
+        pytest.param(
+            "-[x] no space\n  *\t[X] tab\n- [ ]\n- [x]\n  - [ ] ok\nsee - [ ] inline\n-\n[ ] split\n",
+            3, 2, 1, 0, id="ascii_fast_path_edges"  # 复选框后需有内容，空白不跨行
+        ),
+    ])
+    def test_check_remaining_tasks_content(self, content, total, completed, remaining, optional):
+        """测试从文档内容检查剩余任务"""
+        result = check_remaining_tasks_content(content)
+
+        assert result == {
+            "has_remaining": remaining > 0,
+            "total": total,
+            "completed": completed,
+            "remaining": remaining,
+            "optional": optional,
+        }
+
+    @pytest.mark.parametrize("name", list(_FILE_SCENARIOS))
+    def test_check_remaining_tasks_from_file(self, md_corpus, name):
+        """测试从文件检查剩余任务，结果与直接解析内容一致"""
+        assert check_remaining_tasks(md_corpus[name]) == check_remaining_tasks_content(_FILE_SCENARIOS[name])
+
+    def test_check_remaining_tasks_streaming(self, md_corpus, monkeypatch):
+        """测试超过阈值的大文档逐行解析，结果与整篇解析一致"""
+        monkeypatch.setattr("backend.utils.markdown_checker.STREAM_THRESHOLD", 0)
+
+        for name, content in _FILE_SCENARIOS.items():
+            assert check_remaining_tasks(md_corpus[name], use_cache=False) == check_remaining_tasks_content(content)
 
     def test_check_remaining_tasks_nonexistent_file(self):
         """测试不存在的文件"""
@@ -224,119 +266,94 @@ class TestCheckRemainingTasks:
         assert "error" in result
         assert "文档不存在" in result["error"]
 
-    def test_check_remaining_tasks_with_optional_excluded(self):
-        """测试排除可选任务"""
-        content = """
-# Tasks
-
-- [x] Required done
-- [ ] Required pending
-
-## 可选功能
-
-- [ ] Optional 1
-- [ ] Optional 2
-"""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False) as f:
-            f.write(content)
-            temp_path = f.name
-
-        try:
-            clear_cache()
-            result = check_remaining_tasks(temp_path)
-
-            assert result["total"] == 2  # Only required tasks
-            assert result["completed"] == 1
-            assert result["remaining"] == 1
-            assert result["optional"] == 2
-        finally:
-            os.unlink(temp_path)
-
-    def test_check_remaining_tasks_cache(self):
+    def test_check_remaining_tasks_cache(self, md_file):
         """测试缓存功能"""
-        content = "- [ ] Task 1"
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False) as f:
-            f.write(content)
-            temp_path = f.name
-
-        try:
-            clear_cache()
-
-            # First call - should read file
-            result1 = check_remaining_tasks(temp_path, use_cache=True)
-            assert result1["remaining"] == 1
-
-            # Modify file content (without changing mtime significantly)
-            with open(temp_path, 'w') as f:
-                f.write("- [x] Task 1")
-
-            # Second call with cache - should return cached result
-            result2 = check_remaining_tasks(temp_path, use_cache=True)
-            # Note: Cache might still return old result if within TTL
-            # This is expected behavior
-
-            # Call without cache - should read new content
-            clear_cache()
-            result3 = check_remaining_tasks(temp_path, use_cache=False)
-            assert result3["remaining"] == 0
-        finally:
-            os.unlink(temp_path)
+        temp_path = md_file("- [ ] Task 1")
+
+        # First call - should read file
+        result1 = check_remaining_tasks(temp_path, use_cache=True)
+        assert result1["remaining"] == 1
+
+        # Modify file content, keeping its mtime unchanged (no dependence on mtime resolution)
+        path = Path(temp_path)
+        st = path.stat()
+        path.write_text("- [x] Task 1", encoding="utf-8")
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+        # Second call with cache - mtime unchanged and within TTL, returns cached result
+        result2 = check_remaining_tasks(temp_path, use_cache=True)
+        assert result2 == result1
+
+        # Call without cache - should read new content
+        clear_cache()
+        result3 = check_remaining_tasks(temp_path, use_cache=False)
+        assert result3["remaining"] == 0
+
+    def test_check_remaining_tasks_content_hash_cache(self, md_corpus):
+        """测试路径缓存失效后，内容相同的文档按内容哈希复用结果"""
+        first = check_remaining_tasks(md_corpus["pending"])
+        assert first["remaining"] == 1
+        assert first["completed"] == 1
+
+        with patch(
+            "backend.utils.markdown_checker.check_remaining_tasks_content",
+            wraps=check_remaining_tasks_content
+        ) as mock_parse:
+            # 同内容的另一份文档：不重新解析
+            assert check_remaining_tasks(md_corpus["pending_copy"]) == first
+            mock_parse.assert_not_called()
+
+            # 内容变化：重新解析
+            result = check_remaining_tasks(md_corpus["completed"])
+            assert result["remaining"] == 0
+            mock_parse.assert_called_once()
 
 
 class TestClearCache:
     """测试清除缓存"""
 
-    def test_clear_specific_cache(self):
+    def test_clear_specific_cache(self, md_file):
         """测试清除特定文档缓存"""
-        content = "- [ ] Task"
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False) as f:
-            f.write(content)
-            temp_path = f.name
+        temp_path = md_file("- [ ] Task")
 
-        try:
-            # Populate cache
-            check_remaining_tasks(temp_path)
+        # Populate cache
+        check_remaining_tasks(temp_path)
 
-            # Clear specific cache
-            clear_cache(temp_path)
+        # Clear specific cache
+        clear_cache(temp_path)
 
-            # Modify file
-            with open(temp_path, 'w') as f:
-                f.write("- [x] Task")
+        # Modify file
+        Path(temp_path).write_text("- [x] Task", encoding="utf-8")
 
-            # Should read new content
-            result = check_remaining_tasks(temp_path)
-            assert result["remaining"] == 0
-        finally:
-            os.unlink(temp_path)
+        # Should read new content
+        result = check_remaining_tasks(temp_path)
+        assert result["remaining"] == 0
 
     def test_clear_all_cache(self):
         """测试清除所有缓存"""
+        _get_header_level("## 可选任务")
+        _is_optional_section_header("## 可选任务")
+
         clear_cache()  # Clear all
-        # No assertion needed - just verify it doesn't raise
+
+        # 标题判断的行缓存也一并清除
+        assert _get_header_level.cache_info().currsize == 0
+        assert _is_optional_section_header.cache_info().currsize == 0
 
 
 class TestGetTaskProgressSummary:
     """测试获取任务进度摘要"""
 
-    def test_progress_summary_normal(self):
-        """测试正常进度摘要"""
-        content = """
+    def test_progress_summary_normal(self, md_file):
+        """测试正常进度摘要（从文档路径读取）"""
+        doc_path = md_file("""
 - [x] Done 1
 - [x] Done 2
 - [ ] Pending 1
-"""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False) as f:
-            f.write(content)
-            temp_path = f.name
-
-        try:
-            clear_cache()
-            summary = get_task_progress_summary(temp_path)
-            assert "2/3 completed" in summary
-            assert "1 remaining" in summary
-        finally:
-            os.unlink(temp_path)
+""")
+        summary = get_task_progress_summary(doc_path)
+        assert "2/3 completed" in summary
+        assert "1 remaining" in summary
 
     def test_progress_summary_with_optional(self):
         """测试包含可选任务的进度摘要"""
@@ -348,38 +365,27 @@ class TestGetTaskProgressSummary:
 
 - [ ] Optional task
 """
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False) as f:
-            f.write(content)
-            temp_path = f.name
-
-        try:
-            clear_cache()
-            summary = get_task_progress_summary(temp_path)
-            assert "1/2 completed" in summary
-            assert "1 remaining" in summary
-            assert "1 optional excluded" in summary
-        finally:
-            os.unlink(temp_path)
+        summary = get_task_progress_summary(content=content)
+        assert "1/2 completed" in summary
+        assert "1 remaining" in summary
+        assert "1 optional excluded" in summary
 
     def test_progress_summary_no_tasks(self):
         """测试无任务的进度摘要"""
         content = "# Empty document\n\nNo tasks here."
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False) as f:
-            f.write(content)
-            temp_path = f.name
-
-        try:
-            clear_cache()
-            summary = get_task_progress_summary(temp_path)
-            assert "No tasks found" in summary
-        finally:
-            os.unlink(temp_path)
+        summary = get_task_progress_summary(content=content)
+        assert "No tasks found" in summary
 
     def test_progress_summary_error(self):
         """测试错误时的进度摘要"""
         summary = get_task_progress_summary("/nonexistent/file.md")
         assert "Error:" in summary
 
+    def test_progress_summary_no_source(self):
+        """测试既无路径也无内容时的进度摘要"""
+        summary = get_task_progress_summary()
+        assert summary == "Error: 未提供文档路径或内容"
+
     def test_progress_summary_all_completed(self):
         """测试全部完成的进度摘要"""
         content = """
@@ -387,17 +393,9 @@ class TestGetTaskProgressSummary:
 - [x] Done 2
 - [x] Done 3
 """
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False) as f:
-            f.write(content)
-            temp_path = f.name
-
-        try:
-            clear_cache()
-            summary = get_task_progress_summary(temp_path)
-            assert "3/3 completed" in summary
-            assert "0 remaining" in summary
-        finally:
-            os.unlink(temp_path)
+        summary = get_task_progress_summary(content=content)
+        assert "3/3 completed" in summary
+        assert "0 remaining" in summary
 
 
 class TestEdgeCases:
@@ -2,11 +2,77 @@
 Notification Service Tests
 测试通知服务
 """
+import json
+
 import pytest
-from unittest.mock import AsyncMock, MagicMock, patch
+import pytest_asyncio
 import httpx
+from unittest.mock import AsyncMock
+
+from backend.services.notification_service import (
+    NotificationService, get_notification_service, close_notification_service
+)
+
+CALLBACK_URL = "http://localhost:8080/callback"
+
+# 各异步测试只有几行，整个模块共用一个事件循环，省去逐个测试创建和关闭循环的开销
+module_loop = pytest.mark.asyncio(loop_scope="module")
+
+
+class _Callback:
+    """httpx.MockTransport 的回调处理函数：记录请求，返回设定的状态码或抛出设定的异常"""
+
+    def __init__(self):
+        self.requests = []
+        self.status_code = 200
+        self.text = "OK"
+        self.error = None
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.error is not None:
+            raise self.error
+        return httpx.Response(self.status_code, text=self.text)
+
+    @property
+    def payload(self) -> dict:
+        """最后一次请求的 JSON 负载"""
+        return json.loads(self.requests[-1].content)
+
+
+@pytest.fixture
+def callback():
+    """回调处理函数，测试可修改 status_code / error"""
+    return _Callback()
+
+
+@pytest_asyncio.fixture(loop_scope="module")
+async def make_service(callback):
+    """创建经由 MockTransport 走真实 httpx 请求流程的通知服务，测试结束后逐个关闭其 HTTP 客户端"""
+    services = []
+
+    def _make(**kwargs) -> NotificationService:
+        service = NotificationService(transport=httpx.MockTransport(callback), **kwargs)
+        services.append(service)
+        return service
+
+    yield _make
 
-from backend.services.notification_service import NotificationService
+    for service in services:
+        await service.close()
+
+
+async def _send(service: NotificationService, **kwargs) -> bool:
+    """使用默认参数发送通知"""
+    params = {
+        "callback_url": CALLBACK_URL,
+        "task_id": "task_123",
+        "status": "completed",
+        "project_directory": "/tmp/project",
+        "markdown_document_path": "/tmp/project/doc.md",
+    }
+    params.update(kwargs)
+    return await service.send_notification(**params)
 
 
 class TestNotificationService:
@@ -24,272 +90,145 @@ class TestNotificationService:
         assert service.timeout == 60
         assert service.max_retries == 5
 
+    @module_loop
+    async def test_client_reused_across_notifications(self, make_service, callback):
+        """测试多次通知复用同一个 HTTP 客户端"""
+        service = make_service()
 
-class TestSendNotification:
-    """测试发送通知"""
+        await _send(service, task_id="task_1")
+        client = service._client
+        await _send(service, task_id="task_2")
 
-    @pytest.mark.asyncio
-    async def test_send_notification_success(self):
-        """测试发送通知成功"""
-        service = NotificationService()
+        assert service._client is client
+        assert len(callback.requests) == 2
+
+        await service.close()
+        assert client.is_closed
+        assert service._client is None
 
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.text = "OK"
+    @module_loop
+    async def test_shared_notification_service(self):
+        """测试共享通知服务单例"""
+        service = get_notification_service()
+        assert get_notification_service() is service
 
-        with patch("httpx.AsyncClient") as mock_client_class:
-            mock_client = AsyncMock()
-            mock_client.post = AsyncMock(return_value=mock_response)
-            mock_client_class.return_value.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client_class.return_value.__aexit__ = AsyncMock(return_value=None)
+        await close_notification_service()
+        assert get_notification_service() is not service
+        await close_notification_service()
 
-            result = await service.send_notification(
-                callback_url="http://localhost:8080/callback",
-                task_id="task_123",
-                status="completed",
-                project_directory="/tmp/project",
-                markdown_document_path="/tmp/project/doc.md"
-            )
 
-            assert result is True
-            mock_client.post.assert_called_once()
+@module_loop
+class TestSendNotification:
+    """测试发送通知"""
 
-    @pytest.mark.asyncio
     async def test_send_notification_no_callback_url(self):
         """测试没有回调 URL 时跳过"""
-        service = NotificationService()
-
-        result = await service.send_notification(
-            callback_url="",
-            task_id="task_123",
-            status="completed",
-            project_directory="/tmp/project",
-            markdown_document_path="/tmp/project/doc.md"
-        )
+        result = await _send(NotificationService(), callback_url="")
 
         assert result is False
 
-    @pytest.mark.asyncio
     async def test_send_notification_none_callback_url(self):
         """测试回调 URL 为 None 时跳过"""
-        service = NotificationService()
-
-        result = await service.send_notification(
-            callback_url=None,
-            task_id="task_123",
-            status="completed",
-            project_directory="/tmp/project",
-            markdown_document_path="/tmp/project/doc.md"
-        )
+        result = await _send(NotificationService(), callback_url=None)
 
         assert result is False
 
-    @pytest.mark.asyncio
-    async def test_send_notification_http_error(self):
-        """测试 HTTP 错误响应"""
-        service = NotificationService(max_retries=1)
-
-        mock_response = MagicMock()
-        mock_response.status_code = 500
-        mock_response.text = "Internal Server Error"
-
-        with patch("httpx.AsyncClient") as mock_client_class:
-            mock_client = AsyncMock()
-            mock_client.post = AsyncMock(return_value=mock_response)
-            mock_client_class.return_value.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client_class.return_value.__aexit__ = AsyncMock(return_value=None)
-
-            result = await service.send_notification(
-                callback_url="http://localhost:8080/callback",
-                task_id="task_123",
-                status="completed",
-                project_directory="/tmp/project",
-                markdown_document_path="/tmp/project/doc.md"
-            )
-
-            assert result is False
-
-    @pytest.mark.asyncio
-    async def test_send_notification_timeout(self):
-        """测试请求超时"""
-        service = NotificationService(max_retries=1)
-
-        with patch("httpx.AsyncClient") as mock_client_class:
-            mock_client = AsyncMock()
-            mock_client.post = AsyncMock(side_effect=httpx.TimeoutException("Timeout"))
-            mock_client_class.return_value.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client_class.return_value.__aexit__ = AsyncMock(return_value=None)
-
-            result = await service.send_notification(
-                callback_url="http://localhost:8080/callback",
-                task_id="task_123",
-                status="completed",
-                project_directory="/tmp/project",
-                markdown_document_path="/tmp/project/doc.md"
-            )
-
-            assert result is False
-
-    @pytest.mark.asyncio
-    async def test_send_notification_request_error(self):
-        """测试请求错误"""
-        service = NotificationService(max_retries=1)
-
-        with patch("httpx.AsyncClient") as mock_client_class:
-            mock_client = AsyncMock()
-            mock_client.post = AsyncMock(side_effect=httpx.RequestError("Connection refused"))
-            mock_client_class.return_value.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client_class.return_value.__aexit__ = AsyncMock(return_value=None)
-
-            result = await service.send_notification(
-                callback_url="http://localhost:8080/callback",
-                task_id="task_123",
-                status="completed",
-                project_directory="/tmp/project",
-                markdown_document_path="/tmp/project/doc.md"
-            )
-
-            assert result is False
-
-    @pytest.mark.asyncio
-    async def test_send_notification_general_exception(self):
+    @pytest.mark.parametrize("scenario,expected", [
+        ("success", True),
+        ("http_500", False),
+        ("timeout", False),
+        ("request_error", False),
+    ])
+    async def test_send_notification(self, make_service, callback, scenario, expected):
+        """测试发送通知：成功、HTTP 错误响应、请求超时、请求错误"""
+        if scenario == "http_500":
+            callback.status_code = 500
+            callback.text = "Internal Server Error"
+        elif scenario == "timeout":
+            callback.error = httpx.ReadTimeout("Timeout")
+        elif scenario == "request_error":
+            callback.error = httpx.ConnectError("Connection refused")
+
+        result = await _send(make_service(max_retries=1))
+
+        assert result is expected
+        assert len(callback.requests) == 1
+        assert str(callback.requests[0].url) == CALLBACK_URL
+        assert callback.payload["task_id"] == "task_123"
+
+    async def test_send_notification_general_exception(self, make_service, callback):
         """测试通用异常"""
-        service = NotificationService(max_retries=2)
-
-        with patch("httpx.AsyncClient") as mock_client_class:
-            mock_client = AsyncMock()
-            mock_client.post = AsyncMock(side_effect=Exception("Unexpected error"))
-            mock_client_class.return_value.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client_class.return_value.__aexit__ = AsyncMock(return_value=None)
-
-            result = await service.send_notification(
-                callback_url="http://localhost:8080/callback",
-                task_id="task_123",
-                status="completed",
-                project_directory="/tmp/project",
-                markdown_document_path="/tmp/project/doc.md"
-            )
-
-            assert result is False
-            # 通用异常不会重试，只会调用一次
-            assert mock_client.post.call_count == 1
-
-    @pytest.mark.asyncio
-    async def test_send_notification_accepts_multiple_success_codes(self):
-        """测试接受多种成功状态码"""
-        service = NotificationService()
+        callback.error = Exception("Unexpected error")
 
-        for status_code in [200, 201, 202, 204]:
-            mock_response = MagicMock()
-            mock_response.status_code = status_code
-            mock_response.text = "OK"
-
-            with patch("httpx.AsyncClient") as mock_client_class:
-                mock_client = AsyncMock()
-                mock_client.post = AsyncMock(return_value=mock_response)
-                mock_client_class.return_value.__aenter__ = AsyncMock(return_value=mock_client)
-                mock_client_class.return_value.__aexit__ = AsyncMock(return_value=None)
-
-                result = await service.send_notification(
-                    callback_url="http://localhost:8080/callback",
-                    task_id="task_123",
-                    status="completed",
-                    project_directory="/tmp/project",
-                    markdown_document_path="/tmp/project/doc.md"
-                )
-
-                assert result is True, f"Status code {status_code} should be accepted"
-
-    @pytest.mark.asyncio
-    async def test_send_notification_with_error_message(self):
-        """测试带错误信息的通知"""
-        service = NotificationService()
+        result = await _send(make_service(max_retries=2))
 
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.text = "OK"
+        assert result is False
+        # 通用异常不会重试，只会调用一次
+        assert len(callback.requests) == 1
 
-        with patch("httpx.AsyncClient") as mock_client_class:
-            mock_client = AsyncMock()
-            mock_client.post = AsyncMock(return_value=mock_response)
-            mock_client_class.return_value.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client_class.return_value.__aexit__ = AsyncMock(return_value=None)
+    async def test_send_notification_retry_reuses_body(self, make_service, callback, monkeypatch):
+        """测试重试时发送同一份请求体"""
+        monkeypatch.setattr("backend.services.notification_service.asyncio.sleep", AsyncMock())
+        callback.status_code = 500
 
-            result = await service.send_notification(
-                callback_url="http://localhost:8080/callback",
-                task_id="task_123",
-                status="failed",
-                project_directory="/tmp/project",
-                markdown_document_path="/tmp/project/doc.md",
-                error_message="Something went wrong"
-            )
+        result = await _send(make_service(max_retries=3))
 
-            assert result is True
-            # 验证 post 被调用时包含 error_message
-            call_args = mock_client.post.call_args
-            assert "error_message" in call_args.kwargs["json"]
-            assert call_args.kwargs["json"]["error_message"] == "Something went wrong"
+        assert result is False
+        assert len(callback.requests) == 3
+        assert len({request.content for request in callback.requests}) == 1
+        assert callback.requests[0].headers["Content-Type"] == "application/json"
 
+    @pytest.mark.parametrize("status_code", [200, 201, 202, 204])
+    async def test_send_notification_accepts_multiple_success_codes(self, make_service, callback, status_code):
+        """测试接受多种成功状态码"""
+        callback.status_code = status_code
 
-class TestNotifyTaskCompleted:
-    """测试任务完成通知"""
+        result = await _send(make_service())
 
-    @pytest.mark.asyncio
-    async def test_notify_task_completed(self):
-        """测试任务完成通知"""
-        service = NotificationService()
+        assert result is True
 
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.text = "OK"
+    async def test_send_notification_with_error_message(self, make_service, callback):
+        """测试带错误信息的通知"""
+        result = await _send(make_service(), status="failed", error_message="Something went wrong")
 
-        with patch("httpx.AsyncClient") as mock_client_class:
-            mock_client = AsyncMock()
-            mock_client.post = AsyncMock(return_value=mock_response)
-            mock_client_class.return_value.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client_class.return_value.__aexit__ = AsyncMock(return_value=None)
+        assert result is True
+        # 验证请求负载包含 error_message
+        assert callback.payload["error_message"] == "Something went wrong"
 
-            result = await service.notify_task_completed(
-                callback_url="http://localhost:8080/callback",
-                task_id="task_123",
-                project_directory="/tmp/project",
-                markdown_document_path="/tmp/project/doc.md"
-            )
 
-            assert result is True
-            # 验证状态是 completed
-            call_args = mock_client.post.call_args
-            assert call_args.kwargs["json"]["status"] == "completed"
+@module_loop
+class TestNotifyTaskCompleted:
+    """测试任务完成通知"""
 
+    async def test_notify_task_completed(self, make_service, callback):
+        """测试任务完成通知"""
+        result = await make_service().notify_task_completed(
+            callback_url=CALLBACK_URL,
+            task_id="task_123",
+            project_directory="/tmp/project",
+            markdown_document_path="/tmp/project/doc.md"
+        )
+
+        assert result is True
+        # 验证状态是 completed
+        assert callback.payload["status"] == "completed"
 
+
+@module_loop
 class TestNotifyTaskFailed:
     """测试任务失败通知"""
 
-    @pytest.mark.asyncio
-    async def test_notify_task_failed(self):
+    async def test_notify_task_failed(self, make_service, callback):
         """测试任务失败通知"""
-        service = NotificationService()
+        result = await make_service().notify_task_failed(
+            callback_url=CALLBACK_URL,
+            task_id="task_123",
+            project_directory="/tmp/project",
+            markdown_document_path="/tmp/project/doc.md",
+            error_message="Task execution failed"
+        )
 
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.text = "OK"
-
-        with patch("httpx.AsyncClient") as mock_client_class:
-            mock_client = AsyncMock()
-            mock_client.post = AsyncMock(return_value=mock_response)
-            mock_client_class.return_value.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client_class.return_value.__aexit__ = AsyncMock(return_value=None)
-
-            result = await service.notify_task_failed(
-                callback_url="http://localhost:8080/callback",
-                task_id="task_123",
-                project_directory="/tmp/project",
-                markdown_document_path="/tmp/project/doc.md",
-                error_message="Task execution failed"
-            )
-
-            assert result is True
-            # 验证状态是 failed 且有 error_message
-            call_args = mock_client.post.call_args
-            assert call_args.kwargs["json"]["status"] == "failed"
-            assert call_args.kwargs["json"]["error_message"] == "Task execution failed"
+        assert result is True
+        # 验证状态是 failed 且有 error_message
+        assert callback.payload["status"] == "failed"
+        assert callback.payload["error_message"] == "Task execution failed"
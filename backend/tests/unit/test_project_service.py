@@ -3,16 +3,17 @@ Project Service Tests
 测试项目服务
 """
 import pytest
-from unittest.mock import AsyncMock, MagicMock, patch
 
 from backend.services.project_service import ProjectService
 from backend.models.schemas import ProjectCreateRequest, ProjectUpdateRequest
 
+# 使用 conftest 中运行在模块事件循环上的数据库 fixture，测试也在同一循环上运行
+pytestmark = pytest.mark.asyncio(loop_scope="module")
+
 
 class TestProjectService:
     """测试 ProjectService"""
 
-    @pytest.mark.asyncio
     async def test_create_project(self, test_database):
         """测试创建项目"""
         service = ProjectService(db=test_database)
@@ -31,7 +32,6 @@ class TestProjectService:
         assert project.description == "A test project"
         assert project.id is not None
 
-    @pytest.mark.asyncio
     async def test_get_project(self, test_database):
         """测试获取项目"""
         service = ProjectService(db=test_database)
@@ -50,7 +50,6 @@ class TestProjectService:
         assert project.id == created.id
         assert project.name == "Test Project"
 
-    @pytest.mark.asyncio
     async def test_get_project_not_found(self, test_database):
         """测试获取不存在的项目"""
         service = ProjectService(db=test_database)
@@ -59,7 +58,6 @@ class TestProjectService:
 
         assert project is None
 
-    @pytest.mark.asyncio
     async def test_get_project_by_directory(self, test_database):
         """测试根据目录路径获取项目"""
         service = ProjectService(db=test_database)
@@ -77,7 +75,6 @@ class TestProjectService:
         assert project is not None
         assert project.id == created.id
 
-    @pytest.mark.asyncio
     async def test_get_all_projects(self, test_database):
         """测试获取所有项目"""
         service = ProjectService(db=test_database)
@@ -95,7 +92,6 @@ class TestProjectService:
 
         assert len(projects) >= 3
 
-    @pytest.mark.asyncio
     async def test_update_project(self, test_database):
         """测试更新项目"""
         service = ProjectService(db=test_database)
@@ -118,7 +114,6 @@ class TestProjectService:
         assert updated.name == "Updated Name"
         assert updated.description == "Updated description"
 
-    @pytest.mark.asyncio
     async def test_update_project_not_found(self, test_database):
         """测试更新不存在的项目"""
         service = ProjectService(db=test_database)
@@ -128,7 +123,6 @@ class TestProjectService:
 
         assert result is None
 
-    @pytest.mark.asyncio
     async def test_update_project_no_changes(self, test_database):
         """测试无更新内容的更新请求"""
         service = ProjectService(db=test_database)
@@ -147,7 +141,6 @@ class TestProjectService:
         assert result is not None
         assert result.name == "Test Project"
 
-    @pytest.mark.asyncio
     async def test_delete_project(self, test_database):
         """测试删除项目"""
         service = ProjectService(db=test_database)
@@ -168,7 +161,6 @@ class TestProjectService:
         project = await service.get_project(created.id)
         assert project is None
 
-    @pytest.mark.asyncio
     async def test_delete_project_not_found(self, test_database):
         """测试删除不存在的项目"""
         service = ProjectService(db=test_database)
@@ -1,6 +1,8 @@
 """
 Simple test to verify pytest configuration
 """
+import asyncio
+
 import pytest
 
 
@@ -15,10 +17,8 @@ class TestPytestSetup:
         """Test string operations."""
         assert "hello".upper() == "HELLO"
 
-    @pytest.mark.asyncio
     async def test_async_function(self):
         """Test async function works."""
-        import asyncio
         await asyncio.sleep(0.01)
         assert True
 
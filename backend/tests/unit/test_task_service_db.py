@@ -3,9 +3,7 @@ Task Service Database Tests
 测试任务服务数据库操作
 """
 import pytest
-import os
-import tempfile
-from pathlib import Path
+import pytest_asyncio
 from unittest.mock import AsyncMock, patch
 
 from backend.services.task_service_db import TaskServiceDB
@@ -15,15 +13,18 @@ from backend.models.schemas import (
     ProjectCreateRequest
 )
 
+# 使用 conftest 中运行在模块事件循环上的数据库 fixture，测试也在同一循环上运行
+pytestmark = pytest.mark.asyncio(loop_scope="module")
 
-@pytest.fixture
-async def temp_project_with_doc(test_database):
-    """创建带有临时目录和文档的测试项目"""
+
+@pytest_asyncio.fixture(loop_scope="module")
+async def temp_project_with_doc(test_database, tmp_path):
+    """创建带有临时目录和文档的测试项目（目录由 pytest 的 tmp_path 管理）"""
     project_service = ProjectService(db=test_database)
 
-    # 创建临时目录和文档
-    temp_dir = tempfile.mkdtemp()
-    doc_path = Path(temp_dir) / "TEST_DOC.md"
+    # 创建临时文档
+    temp_dir = str(tmp_path)
+    doc_path = tmp_path / "TEST_DOC.md"
     doc_path.write_text("# Test Document\n\n- [ ] Task 1\n- [ ] Task 2")
 
     # 创建项目
@@ -41,17 +42,10 @@ async def temp_project_with_doc(test_database):
         "relative_doc_path": "/TEST_DOC.md"
     }
 
-    # 清理
-    if os.path.exists(str(doc_path)):
-        os.unlink(str(doc_path))
-    if os.path.exists(temp_dir):
-        os.rmdir(temp_dir)
-
 
 class TestTaskServiceCRUD:
     """测试任务 CRUD 操作"""
 
-    @pytest.mark.asyncio
     async def test_create_task(self, test_database, temp_project_with_doc):
         """测试创建任务"""
         service = TaskServiceDB(db=test_database)
@@ -72,7 +66,6 @@ class TestTaskServiceCRUD:
         assert task.status == "pending"
         assert task.cli_type == "claude_code"
 
-    @pytest.mark.asyncio
     async def test_create_task_with_callback(self, test_database, temp_project_with_doc):
         """测试创建带回调的任务"""
         service = TaskServiceDB(db=test_database)
@@ -89,7 +82,6 @@ class TestTaskServiceCRUD:
         assert task is not None
         assert task.callback_url == "http://localhost:8080/callback"
 
-    @pytest.mark.asyncio
     async def test_create_task_with_review_enabled(self, test_database, temp_project_with_doc):
         """测试创建启用审查的任务"""
         service = TaskServiceDB(db=test_database)
@@ -106,7 +98,6 @@ class TestTaskServiceCRUD:
         assert task is not None
         assert task.enable_review is True
 
-    @pytest.mark.asyncio
     async def test_create_task_project_not_found(self, test_database):
         """测试创建任务时项目不存在"""
         service = TaskServiceDB(db=test_database)
@@ -119,7 +110,6 @@ class TestTaskServiceCRUD:
         with pytest.raises(ValueError, match="Project not found"):
             await service.create_task(request)
 
-    @pytest.mark.asyncio
     async def test_create_task_doc_not_found(self, test_database, temp_project_with_doc):
         """测试创建任务时文档不存在"""
         service = TaskServiceDB(db=test_database)
@@ -133,7 +123,6 @@ class TestTaskServiceCRUD:
         with pytest.raises(ValueError, match="文档不存在"):
             await service.create_task(request)
 
-    @pytest.mark.asyncio
     async def test_get_task(self, test_database, temp_project_with_doc):
         """测试获取单个任务"""
         service = TaskServiceDB(db=test_database)
@@ -153,7 +142,6 @@ class TestTaskServiceCRUD:
         assert task.id == created.id
         assert task.project_directory == project_data["temp_dir"]
 
-    @pytest.mark.asyncio
     async def test_get_task_basic(self, test_database, temp_project_with_doc):
         """测试获取任务基本信息（不含日志）"""
         service = TaskServiceDB(db=test_database)
@@ -174,7 +162,6 @@ class TestTaskServiceCRUD:
         # 基本信息不包含日志
         assert task.logs is None
 
-    @pytest.mark.asyncio
     async def test_get_task_not_found(self, test_database):
         """测试获取不存在的任务"""
         service = TaskServiceDB(db=test_database)
@@ -183,7 +170,6 @@ class TestTaskServiceCRUD:
 
         assert task is None
 
-    @pytest.mark.asyncio
     async def test_get_all_tasks(self, test_database, temp_project_with_doc):
         """测试获取所有任务"""
         service = TaskServiceDB(db=test_database)
@@ -203,7 +189,6 @@ class TestTaskServiceCRUD:
 
         assert len(tasks) >= 3
 
-    @pytest.mark.asyncio
     async def test_update_task_status(self, test_database, temp_project_with_doc):
         """测试更新任务状态"""
         service = TaskServiceDB(db=test_database)
@@ -223,7 +208,10 @@ class TestTaskServiceCRUD:
         assert updated is not None
         assert updated.status == "in_progress"
 
-    @pytest.mark.asyncio
+        # 更新日志与更新在同一事务中写入
+        logs = await service.get_task_logs(created.id)
+        assert any(log.message == "Task updated: status" for log in logs)
+
     async def test_update_task_cli_type(self, test_database, temp_project_with_doc):
         """测试更新任务 CLI 类型"""
         service = TaskServiceDB(db=test_database)
@@ -244,7 +232,6 @@ class TestTaskServiceCRUD:
         assert updated is not None
         assert updated.cli_type == "codex"
 
-    @pytest.mark.asyncio
     async def test_update_task_not_found(self, test_database):
         """测试更新不存在的任务"""
         service = TaskServiceDB(db=test_database)
@@ -254,7 +241,6 @@ class TestTaskServiceCRUD:
 
         assert result is None
 
-    @pytest.mark.asyncio
     async def test_delete_task(self, test_database, temp_project_with_doc):
         """测试删除任务"""
         service = TaskServiceDB(db=test_database)
@@ -276,7 +262,6 @@ class TestTaskServiceCRUD:
         task = await service.get_task(created.id)
         assert task is None
 
-    @pytest.mark.asyncio
     async def test_delete_task_not_found(self, test_database):
         """测试删除不存在的任务"""
         service = TaskServiceDB(db=test_database)
@@ -289,7 +274,6 @@ class TestTaskServiceCRUD:
 class TestTaskStateTransitions:
     """测试任务状态流转"""
 
-    @pytest.mark.asyncio
     async def test_pending_to_in_progress_to_completed(self, test_database, temp_project_with_doc):
         """测试 pending → in_progress → completed"""
         service = TaskServiceDB(db=test_database)
@@ -316,7 +300,6 @@ class TestTaskStateTransitions:
         assert task.status == "completed"
         assert task.completed_at is not None
 
-    @pytest.mark.asyncio
     async def test_pending_to_in_progress_to_failed(self, test_database, temp_project_with_doc):
         """测试 pending → in_progress → failed"""
         service = TaskServiceDB(db=test_database)
@@ -350,7 +333,6 @@ class TestTaskStateTransitions:
         assert len(error_logs) > 0
         assert error_message in error_logs[-1].message
 
-    @pytest.mark.asyncio
     async def test_pause_task(self, test_database, temp_project_with_doc):
         """测试暂停任务"""
         service = TaskServiceDB(db=test_database)
@@ -370,7 +352,6 @@ class TestTaskStateTransitions:
         task = await service.get_task(task.id)
         assert task.status == "paused"
 
-    @pytest.mark.asyncio
     async def test_start_task_and_return(self, test_database, temp_project_with_doc):
         """测试启动任务并返回"""
         service = TaskServiceDB(db=test_database)
@@ -388,7 +369,6 @@ class TestTaskStateTransitions:
         assert updated_task is not None
         assert updated_task.status == "in_progress"
 
-    @pytest.mark.asyncio
     async def test_get_pending_tasks(self, test_database, temp_project_with_doc):
         """测试获取待处理任务"""
         service = TaskServiceDB(db=test_database)
@@ -414,7 +394,6 @@ class TestTaskStateTransitions:
 class TestTaskLogs:
     """测试任务日志功能"""
 
-    @pytest.mark.asyncio
     async def test_add_task_log(self, test_database, temp_project_with_doc):
         """测试添加任务日志"""
         service = TaskServiceDB(db=test_database)
@@ -440,7 +419,6 @@ class TestTaskLogs:
         assert len(test_logs) == 1
         assert test_logs[0].level == "INFO"
 
-    @pytest.mark.asyncio
     async def test_add_error_log_immediately(self, test_database, temp_project_with_doc):
         """测试错误日志立即写入"""
         service = TaskServiceDB(db=test_database)
@@ -462,7 +440,6 @@ class TestTaskLogs:
         error_logs = [log for log in logs if log.level == "ERROR"]
         assert len(error_logs) >= 1
 
-    @pytest.mark.asyncio
     async def test_get_task_logs_with_limit(self, test_database, temp_project_with_doc):
         """测试获取日志带限制"""
         service = TaskServiceDB(db=test_database)
@@ -483,7 +460,6 @@ class TestTaskLogs:
         logs = await service.get_task_logs(task.id, limit=3)
         assert len(logs) <= 3
 
-    @pytest.mark.asyncio
     async def test_flush_logs(self, test_database, temp_project_with_doc):
         """测试刷新日志缓冲"""
         service = TaskServiceDB(db=test_database)
@@ -511,7 +487,6 @@ class TestTaskLogs:
 class TestTaskCallbacks:
     """测试任务回调通知"""
 
-    @pytest.mark.asyncio
     async def test_complete_task_with_callback(self, test_database, temp_project_with_doc):
         """测试完成任务时发送回调"""
         service = TaskServiceDB(db=test_database)
@@ -528,13 +503,12 @@ class TestTaskCallbacks:
         # Mock 通知服务
         with patch.object(service.notification_service, 'notify_task_completed', new_callable=AsyncMock) as mock_notify:
             await service.complete_task(task.id)
-            # 回调是异步创建的任务，需要等待一下
-            import asyncio
-            await asyncio.sleep(0.1)
+            # 回调是异步创建的任务，等待其完成
+            await service.flush_notifications()
             # 验证回调被调用
             mock_notify.assert_called_once()
+            assert not service._notify_tasks
 
-    @pytest.mark.asyncio
     async def test_fail_task_with_callback(self, test_database, temp_project_with_doc):
         """测试任务失败时发送回调"""
         service = TaskServiceDB(db=test_database)
@@ -551,17 +525,16 @@ class TestTaskCallbacks:
         # Mock 通知服务
         with patch.object(service.notification_service, 'notify_task_failed', new_callable=AsyncMock) as mock_notify:
             await service.fail_task(task.id, "Error occurred")
-            # 回调是异步创建的任务，需要等待一下
-            import asyncio
-            await asyncio.sleep(0.1)
+            # 回调是异步创建的任务，等待其完成
+            await service.flush_notifications()
             # 验证回调被调用
             mock_notify.assert_called_once()
+            assert not service._notify_tasks
 
 
 class TestTaskHelperMethods:
     """测试辅助方法"""
 
-    @pytest.mark.asyncio
     async def test_get_task_raw(self, test_database, temp_project_with_doc):
         """测试获取任务原始数据"""
         service = TaskServiceDB(db=test_database)
@@ -579,7 +552,6 @@ class TestTaskHelperMethods:
         assert raw_task is not None
         assert raw_task["id"] == task.id
 
-    @pytest.mark.asyncio
     async def test_update_task_fields(self, test_database, temp_project_with_doc):
         """测试直接更新任务字段"""
         service = TaskServiceDB(db=test_database)
@@ -604,7 +576,6 @@ class TestTaskHelperMethods:
 class TestPathValidation:
     """测试路径验证"""
 
-    @pytest.mark.asyncio
     async def test_validate_nonexistent_directory(self, test_database):
         """测试项目目录不存在"""
         service = TaskServiceDB(db=test_database)
@@ -612,7 +583,6 @@ class TestPathValidation:
         with pytest.raises(ValueError, match="项目目录不存在"):
             service._validate_paths("/nonexistent/directory", "/nonexistent/directory/doc.md")
 
-    @pytest.mark.asyncio
     async def test_validate_path_is_not_directory(self, test_database, temp_project_with_doc):
         """测试项目路径不是目录"""
         service = TaskServiceDB(db=test_database)
@@ -622,7 +592,6 @@ class TestPathValidation:
         with pytest.raises(ValueError, match="项目路径不是目录"):
             service._validate_paths(project_data["doc_path"], project_data["doc_path"])
 
-    @pytest.mark.asyncio
     async def test_validate_doc_is_not_file(self, test_database, temp_project_with_doc):
         """测试文档路径不是文件"""
         service = TaskServiceDB(db=test_database)
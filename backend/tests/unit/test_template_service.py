@@ -2,16 +2,23 @@
 Template Service Tests
 测试模板服务
 """
+import gc
+
 import pytest
+from unittest.mock import AsyncMock, patch
 
+import backend.services.template_service as template_service_module
 from backend.services.template_service import TemplateService
 from backend.models.schemas import TemplateCreateRequest, TemplateUpdateRequest
 
+# 使用 conftest 中运行在模块事件循环上的数据库 fixture，异步测试也在同一循环上运行
+module_loop = pytest.mark.asyncio(loop_scope="module")
+
 
+@module_loop
 class TestTemplateService:
     """测试 TemplateService"""
 
-    @pytest.mark.asyncio
     async def test_initialize_default_templates(self, test_database):
         """测试初始化创建默认模板"""
         service = TemplateService(db=test_database)
@@ -29,7 +36,17 @@ class TestTemplateService:
         assert "review" in types
         assert "continue_task" in types
 
-    @pytest.mark.asyncio
+    async def test_database_created_lazily(self, temp_db_path):
+        """测试未注入 db 时首次使用才创建数据库实例"""
+        service = TemplateService(db_path=temp_db_path)
+        assert service._db is None
+
+        templates = await service.get_all_templates()
+
+        assert len(templates) >= 4
+        assert service.db.db_path == temp_db_path
+        await service.db.close()
+
     async def test_get_all_templates(self, test_database):
         """测试获取所有模板"""
         service = TemplateService(db=test_database)
@@ -39,7 +56,6 @@ class TestTemplateService:
         assert isinstance(templates, list)
         assert len(templates) >= 4
 
-    @pytest.mark.asyncio
     async def test_get_template(self, test_database):
         """测试获取单个模板"""
         service = TemplateService(db=test_database)
@@ -51,7 +67,6 @@ class TestTemplateService:
         assert template.type == "initial_task"
         assert template.is_default is True
 
-    @pytest.mark.asyncio
     async def test_get_template_not_found(self, test_database):
         """测试获取不存在的模板"""
         service = TemplateService(db=test_database)
@@ -60,7 +75,6 @@ class TestTemplateService:
 
         assert template is None
 
-    @pytest.mark.asyncio
     async def test_get_templates_by_type(self, test_database):
         """测试按类型获取模板"""
         service = TemplateService(db=test_database)
@@ -71,7 +85,6 @@ class TestTemplateService:
         for t in templates:
             assert t.type == "initial_task"
 
-    @pytest.mark.asyncio
     async def test_get_default_template(self, test_database):
         """测试获取默认模板"""
         service = TemplateService(db=test_database)
@@ -82,7 +95,6 @@ class TestTemplateService:
         assert template.type == "initial_task"
         assert template.is_default is True
 
-    @pytest.mark.asyncio
     async def test_create_template(self, test_database):
         """测试创建模板"""
         service = TemplateService(db=test_database)
@@ -101,7 +113,6 @@ class TestTemplateService:
         assert template.type == "custom"
         assert template.content == "Hello {{name}}!"
 
-    @pytest.mark.asyncio
     async def test_create_template_as_default(self, test_database):
         """测试创建默认模板"""
         service = TemplateService(db=test_database)
@@ -131,7 +142,29 @@ class TestTemplateService:
         # 第二个应该是默认
         assert second.is_default is True
 
-    @pytest.mark.asyncio
+    async def test_update_template_as_default_clears_others(self, test_database):
+        """测试更新为默认模板时清除同类型的其他默认"""
+        service = TemplateService(db=test_database)
+
+        first = await service.create_template(TemplateCreateRequest(
+            name="First", type="clear_test", content="First", is_default=True
+        ))
+        second = await service.create_template(TemplateCreateRequest(
+            name="Second", type="clear_test", content="Second"
+        ))
+
+        # 不存在的模板不会清除已有默认
+        assert await service.update_template(
+            "nonexistent", TemplateUpdateRequest(type="clear_test", is_default=True)
+        ) is None
+        assert (await service.get_template(first.id)).is_default is True
+
+        updated = await service.update_template(second.id, TemplateUpdateRequest(is_default=True))
+
+        assert updated.is_default is True
+        assert (await service.get_template(first.id)).is_default is False
+        assert (await service.get_default_template("clear_test")).id == second.id
+
     async def test_update_template(self, test_database):
         """测试更新模板"""
         service = TemplateService(db=test_database)
@@ -155,7 +188,26 @@ class TestTemplateService:
         assert updated.name == "Updated"
         assert updated.content == "Updated content"
 
-    @pytest.mark.asyncio
+    async def test_create_and_update_skip_refetch(self, test_database):
+        """测试创建和更新直接返回写入的行，不再额外查询模板"""
+        service = TemplateService(db=test_database)
+        await service.initialize()
+
+        with patch.object(service.template_dao, "get_template", new_callable=AsyncMock) as mock_get:
+            created = await service.create_template(TemplateCreateRequest(
+                name="No Refetch",
+                type="refetch_test",
+                content="Created"
+            ))
+            updated = await service.update_template(created.id, TemplateUpdateRequest(content="Updated"))
+            mock_get.assert_not_called()
+
+        assert created.content == "Created"
+        assert created.created_at
+        assert updated.id == created.id
+        assert updated.content == "Updated"
+        assert updated.name == "No Refetch"
+
     async def test_update_template_not_found(self, test_database):
         """测试更新不存在的模板"""
         service = TemplateService(db=test_database)
@@ -165,7 +217,6 @@ class TestTemplateService:
 
         assert result is None
 
-    @pytest.mark.asyncio
     async def test_delete_template(self, test_database):
         """测试删除模板"""
         service = TemplateService(db=test_database)
@@ -187,7 +238,6 @@ class TestTemplateService:
         template = await service.get_template(created.id)
         assert template is None
 
-    @pytest.mark.asyncio
     async def test_set_default_template(self, test_database):
         """测试设置默认模板"""
         service = TemplateService(db=test_database)
@@ -217,10 +267,10 @@ class TestTemplateService:
         assert default.id == tpl2.id
 
 
+@module_loop
 class TestTemplateServiceRender:
     """测试模板渲染功能"""
 
-    @pytest.mark.asyncio
     async def test_render_template(self, test_database):
         """测试渲染模板"""
         service = TemplateService(db=test_database)
@@ -239,7 +289,6 @@ class TestTemplateServiceRender:
         assert "task_123" in content
         assert "http://localhost:8086" in content
 
-    @pytest.mark.asyncio
     async def test_render_template_async(self, test_database):
         """测试异步渲染模板"""
         service = TemplateService(db=test_database)
@@ -256,7 +305,6 @@ class TestTemplateServiceRender:
         assert "/home/user/project" in content
         assert "task_456" in content
 
-    @pytest.mark.asyncio
     async def test_render_template_not_found(self, test_database):
         """测试渲染不存在的模板类型"""
         service = TemplateService(db=test_database)
@@ -266,7 +314,6 @@ class TestTemplateServiceRender:
 
         assert "No default template found" in str(exc_info.value)
 
-    @pytest.mark.asyncio
     async def test_render_template_with_english(self, test_database):
         """测试英文模板渲染"""
         service = TemplateService(db=test_database)
@@ -296,3 +343,112 @@ class TestTemplateServiceRender:
             name="Test"
         )
         assert "English content: Test" in en_content
+
+    async def test_render_template_uses_default_cache(self, test_database):
+        """测试默认模板缓存及修改后失效"""
+        service = TemplateService(db=test_database)
+
+        request = TemplateCreateRequest(
+            name="Cached",
+            type="cache_test",
+            content="v1: {name}",
+            is_default=True
+        )
+        created = await service.create_template(request)
+
+        assert await service.render_template_async("cache_test", name="a") == "v1: a"
+
+        # 命中缓存时不再查询默认模板
+        with patch.object(service.template_dao, "get_template_by_type", new_callable=AsyncMock) as mock_get:
+            assert await service.render_template_async("cache_test", name="b") == "v1: b"
+            mock_get.assert_not_called()
+
+        # 同一数据库上的其他实例修改模板后缓存失效
+        other = TemplateService(db=test_database)
+        await other.update_template(created.id, TemplateUpdateRequest(content="v2: {name}"))
+        assert await service.render_template_async("cache_test", name="c") == "v2: c"
+
+    async def test_render_template_single_pass(self, test_database):
+        """测试变量只替换一次，未知变量和 JSON 花括号保持原样"""
+        service = TemplateService(db=test_database)
+
+        request = TemplateCreateRequest(
+            name="Single Pass",
+            type="single_pass_test",
+            content='{a} {b} {unknown} -d \'{"status": "completed"}\'',
+            is_default=True
+        )
+        await service.create_template(request)
+
+        content = await service.render_template_async("single_pass_test", a="{b}", b="B")
+
+        assert content == '{b} B {unknown} -d \'{"status": "completed"}\''
+
+    async def test_render_template_non_identifier_keys(self, test_database):
+        """测试非 ASCII 和含连字符的变量名同样会被替换"""
+        service = TemplateService(db=test_database)
+
+        request = TemplateCreateRequest(
+            name="Non Identifier Keys",
+            type="non_identifier_test",
+            content="目录: {项目目录} 文档: {doc-path} {0}",
+            is_default=True
+        )
+        await service.create_template(request)
+
+        content = await service.render_template_async(
+            "non_identifier_test", **{"项目目录": "/tmp/project", "doc-path": "docs/task.md"}
+        )
+
+        assert content == "目录: /tmp/project 文档: docs/task.md {0}"
+
+    async def test_render_templates_batch(self, test_database):
+        """测试批量渲染多个模板只查询一次"""
+        service = TemplateService(db=test_database)
+        await service.initialize()
+
+        with patch.object(
+            service.template_dao, "get_default_templates_by_types",
+            wraps=service.template_dao.get_default_templates_by_types
+        ) as mock_batch:
+            results = await service.render_templates_batch(
+                ["initial_task", "resume_task", "initial_task"],
+                locale="en",
+                project_dir="/tmp/project",
+                doc_path="/tmp/project/TODO.md",
+                task_id="task_789",
+                api_base_url="http://localhost:8086"
+            )
+            mock_batch.assert_called_once()
+
+        assert set(results) == {"initial_task", "resume_task"}
+        assert results["initial_task"] == await service.render_template_async(
+            "initial_task",
+            locale="en",
+            project_dir="/tmp/project",
+            doc_path="/tmp/project/TODO.md",
+            task_id="task_789",
+            api_base_url="http://localhost:8086"
+        )
+        assert "task_789" in results["resume_task"]
+
+        with pytest.raises(ValueError) as exc_info:
+            await service.render_templates_batch(["initial_task", "nonexistent_type"])
+        assert "No default template found" in str(exc_info.value)
+
+
+class TestDefaultTemplateCache:
+    """测试默认模板缓存的共享与释放"""
+
+    def test_default_cache_released_with_services(self, tmp_path):
+        """测试同一路径的服务共用缓存，服务全部释放后缓存条目随之移除"""
+        db_path = str(tmp_path / "cache.db")
+        first = TemplateService(db_path)
+        second = TemplateService(db_path)
+        assert first._default_cache is second._default_cache
+        assert db_path in template_service_module._default_template_caches
+
+        del first, second
+        gc.collect()
+
+        assert db_path not in template_service_module._default_template_caches
@@ -1,26 +1,57 @@
 """
 Markdown文档进度检查工具 - 检测任务完成情况
 """
+import hashlib
+import os
 import re
 import time
+from collections import OrderedDict
 from functools import lru_cache
-from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
 # 优化4.1: 使用简单的 TTL 缓存来缓存 Markdown 解析结果
 _cache: Dict[str, Dict] = {}
 _cache_timestamps: Dict[str, float] = {}
 CACHE_TTL = 30  # 30秒缓存过期
 
+# 按内容哈希缓存统计结果：路径缓存失效（文件被 touch、或不同路径内容相同）时，
+# 内容未变就不必重新解析
+_content_cache: "OrderedDict[bytes, Dict]" = OrderedDict()
+CONTENT_CACHE_SIZE = 256
 
+# 超过该大小的文档逐行流式解析，不整篇读入内存
+STREAM_THRESHOLD = 1024 * 1024
+STREAM_BUFFER_SIZE = 64 * 1024
+
+
+# 预编译的匹配模式（逐行解析时复用，避免每次调用 re.match 查找模式缓存）
+_HEADER_RE = re.compile(r'^(#{1,6})\s+')
+# 任务行：group(1) 为复选框内容，空白表示未完成，x/X 表示已完成。
+# 复选框后只需确认还有一个字符，不必像 \s*(.+)$ 那样扫描到行尾
+_TASK_RE = re.compile(r'\s*[-*+]\s*\[([\sxX])\].')
+# 标题或任务行去掉前导空白后的首字符，其余行（正文、空行）无需进入正则匹配
+_LINE_START_CHARS = frozenset('#-*+')
+# 整篇一次扫描的候选行：group(1) 为标题的 #，group(2) 为任务复选框内容；
+# 分别与 _HEADER_RE、_TASK_RE 的逐行匹配等价，匹配文本为整行
+_SCAN_RE = re.compile(
+    r'^(?:(#{1,6})[^\S\n]|[^\S\n]*[-*+][^\S\n]*\[([^\S\n]|[xX])\][^\n])[^\n]*',
+    re.MULTILINE
+)
+# 整篇匹配的任务行：与 _TASK_RE 逐行匹配等价，空白不跨行（[^\S\n]），
+# 供不含可选任务的文档一次 findall 完成统计
+_TASK_LINE_RE = re.compile(r'^[^\S\n]*[-*+][^\S\n]*\[([^\S\n]|[xX])\][^\n]', re.MULTILINE)
+
+
+# 标题行在模板生成的文档中大量重复（"## 可选任务" 等），按行内容缓存标题判断结果；
+# 任务行内容各不相同，缓存只会增加未命中开销，不做缓存
+HEADER_CACHE_SIZE = 2048
+
+
+@lru_cache(maxsize=HEADER_CACHE_SIZE)
 def _is_optional_section_header(line: str) -> bool:
     """检查是否为可选章节的标题"""
-    # 匹配 markdown 标题（# ## ### 等）
-    if not re.match(r'^#{1,6}\s+', line):
-        return False
-    # 检查标题是否包含"可选"或"optional"（不区分大小写）
-    lower_line = line.lower()
-    return '可选' in line or 'optional' in lower_line
+    # 用 lower() 而不是 re.IGNORECASE：后者会把 ı/İ 当作 i 匹配
+    return _get_header_level(line) > 0 and ('可选' in line or 'optional' in line.lower())
 
 
 def _is_optional_task(task_line: str) -> bool:
@@ -29,9 +60,10 @@ def _is_optional_task(task_line: str) -> bool:
     return '可选' in task_line or 'optional' in lower_line
 
 
+@lru_cache(maxsize=HEADER_CACHE_SIZE)
 def _get_header_level(line: str) -> int:
     """获取标题级别，非标题返回 0"""
-    match = re.match(r'^(#{1,6})\s+', line)
+    match = _HEADER_RE.match(line)
     return len(match.group(1)) if match else 0
 
 
@@ -42,8 +74,6 @@ def _parse_tasks_with_optional_filter(content: str) -> Tuple[List[str], List[str
     Returns:
         Tuple: (必选未完成任务列表, 必选已完成任务列表, 可选任务列表)
     """
-    lines = content.split('\n')
-
     required_unchecked = []
     required_checked = []
     optional_tasks = []
@@ -52,13 +82,48 @@ def _parse_tasks_with_optional_filter(content: str) -> Tuple[List[str], List[str
     in_optional_section = False
     optional_section_level = 0
 
-    # 任务匹配模式
-    unchecked_pattern = r'^[\s]*[-\*\+]\s*\[\s\]\s*(.+)$'
-    checked_pattern = r'^[\s]*[-\*\+]\s*\[[xX]\]\s*(.+)$'
+    # 正文、空行等非候选行在正则引擎内跳过，只有标题和任务行回到 Python
+    for match in _SCAN_RE.finditer(content):
+        header, mark = match.groups()
+        line = match.group()
+
+        if header:
+            header_level = len(header)
+            if _is_optional_section_header(line):
+                # 进入可选章节
+                in_optional_section = True
+                optional_section_level = header_level
+            elif in_optional_section and header_level <= optional_section_level:
+                # 遇到同级或更高级别的标题，退出可选章节
+                in_optional_section = False
+                optional_section_level = 0
+        elif in_optional_section or _is_optional_task(line):
+            optional_tasks.append(line.strip())
+        elif mark in 'xX':
+            required_checked.append(line.strip())
+        else:
+            required_unchecked.append(line.strip())
+
+    return required_unchecked, required_checked, optional_tasks
+
+
+def _parse_task_lines(lines: Iterable[str]) -> Tuple[List[str], List[str], List[str]]:
+    """逐行解析任务（行尾不含换行符），可直接消费文件迭代器，无需整篇读入内存"""
+    required_unchecked = []
+    required_checked = []
+    optional_tasks = []
+
+    # 跟踪当前是否在可选章节内
+    in_optional_section = False
+    optional_section_level = 0
 
     for line in lines:
-        # 检查是否为标题行
-        header_level = _get_header_level(line)
+        # 快速跳过不可能是标题或任务的行
+        if line.lstrip()[:1] not in _LINE_START_CHARS:
+            continue
+
+        # 检查是否为标题行（标题必须从行首的 # 开始，任务行不必进入标题匹配）
+        header_level = _get_header_level(line) if line[:1] == '#' else 0
 
         if header_level > 0:
             # 如果遇到新标题
@@ -72,41 +137,100 @@ def _parse_tasks_with_optional_filter(content: str) -> Tuple[List[str], List[str
                 optional_section_level = 0
             continue
 
-        # 检查未完成任务
-        unchecked_match = re.match(unchecked_pattern, line)
-        if unchecked_match:
-            task_text = unchecked_match.group(1)
+        # 检查任务行（未完成/已完成）
+        task_match = _TASK_RE.match(line)
+        if task_match:
             if in_optional_section or _is_optional_task(line):
                 optional_tasks.append(line.strip())
+            elif task_match.group(1) in 'xX':
+                required_checked.append(line.strip())
             else:
                 required_unchecked.append(line.strip())
-            continue
-
-        # 检查已完成任务
-        checked_match = re.match(checked_pattern, line)
-        if checked_match:
-            task_text = checked_match.group(1)
-            if in_optional_section or _is_optional_task(line):
-                optional_tasks.append(line.strip())
-            else:
-                required_checked.append(line.strip())
 
     return required_unchecked, required_checked, optional_tasks
 
 
-def _get_file_mtime(doc_path: str) -> float:
-    """获取文件修改时间"""
+def _check_remaining_tasks_streaming(doc_path: str) -> Dict:
+    """逐行读取并统计大文档，内存中只保留当前行（不经过内容哈希缓存）"""
+    with open(doc_path, 'r', encoding='utf-8', buffering=STREAM_BUFFER_SIZE) as f:
+        return _count_tasks(*map(len, _parse_task_lines(line.rstrip('\n') for line in f)))
+
+
+def _read_file_bytes(doc_path: str) -> bytes:
+    """以原始字节读取整个文件（os.read，不经过缓冲读取器和文本解码）"""
+    fd = os.open(doc_path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
     try:
-        return Path(doc_path).stat().st_mtime
-    except Exception:
-        return 0
+        size = os.fstat(fd).st_size
+        chunks = []
+        while True:
+            # 通常一次读完；文件在读取期间增长时继续读到末尾
+            chunk = os.read(fd, max(size, 4096))
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b"".join(chunks)
+    finally:
+        os.close(fd)
+
+
+def check_remaining_tasks_content(content: str) -> Dict:
+    """
+    统计文档内容中的任务进度（排除可选任务），不读取文件、不使用缓存
+
+    Args:
+        content: markdown文档内容
+
+    Returns:
+        dict: 与 check_remaining_tasks 相同的统计结果（不含 error）
+    """
+    # 常见情况：纯 ASCII 且不含 "optional"（ASCII 文档也不可能含 "可选"），
+    # 没有可选章节和可选任务，标题不影响统计，整篇一次 findall 计数即可
+    if content.isascii() and 'optional' not in content.lower():
+        marks = _TASK_LINE_RE.findall(content)
+        completed = marks.count('x') + marks.count('X')
+        return _count_tasks(len(marks) - completed, completed, 0)
+
+    return _count_tasks(*map(len, _parse_tasks_with_optional_filter(content)))
+
+
+def _count_tasks(remaining: int, completed: int, optional: int) -> Dict:
+    """由必选未完成、必选已完成、可选任务数生成统计结果"""
+    return {
+        "has_remaining": remaining > 0,
+        "total": remaining + completed,
+        "completed": completed,
+        "remaining": remaining,
+        "optional": optional
+    }
+
+
+def _check_remaining_tasks_bytes(data: bytes, use_cache: bool = True) -> Dict:
+    """统计文档字节内容中的任务进度，按内容哈希（blake2b）复用已有的统计结果"""
+    key = hashlib.blake2b(data, digest_size=8).digest()
+    if use_cache:
+        result = _content_cache.get(key)
+        if result is not None:
+            _content_cache.move_to_end(key)
+            return result
+
+    content = data.decode('utf-8')
+    if '\r' in content:
+        # 与文本模式读取一致：统一换行符
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+    result = check_remaining_tasks_content(content)
+
+    _content_cache[key] = result
+    if len(_content_cache) > CONTENT_CACHE_SIZE:
+        _content_cache.popitem(last=False)
+    return result
 
 
 def check_remaining_tasks(doc_path: str, use_cache: bool = True) -> Dict:
     """
     检查markdown文档中的任务进度（排除可选任务）
 
-    优化4.1: 使用 LRU Cache + 文件修改时间检测，避免重复解析
+    优化4.1: 使用 LRU Cache + 文件修改时间检测，避免重复解析；
+    文件修改时间变化但内容未变时，按内容哈希复用统计结果
 
     Args:
         doc_path: markdown文档路径
@@ -124,8 +248,10 @@ def check_remaining_tasks(doc_path: str, use_cache: bool = True) -> Dict:
     global _cache, _cache_timestamps
 
     try:
-        doc_file = Path(doc_path)
-        if not doc_file.exists():
+        # 一次 stat 同时完成存在性检查和修改时间读取
+        try:
+            stat = os.stat(doc_path)
+        except (FileNotFoundError, NotADirectoryError):
             return {
                 "has_remaining": False,
                 "total": 0,
@@ -138,30 +264,16 @@ def check_remaining_tasks(doc_path: str, use_cache: bool = True) -> Dict:
         # 优化4.1: 检查缓存
         if use_cache and doc_path in _cache:
             cache_time = _cache_timestamps.get(doc_path, 0)
-            file_mtime = _get_file_mtime(doc_path)
 
             # 如果缓存未过期且文件未修改，返回缓存结果
-            if (time.time() - cache_time < CACHE_TTL) and (file_mtime <= cache_time):
+            if (time.time() - cache_time < CACHE_TTL) and (stat.st_mtime <= cache_time):
                 return _cache[doc_path]
 
-        # 读取文档内容
-        content = doc_file.read_text(encoding='utf-8')
-
-        # 解析任务，区分必选和可选
-        required_unchecked, required_checked, optional_tasks = _parse_tasks_with_optional_filter(content)
-
-        total = len(required_unchecked) + len(required_checked)
-        completed = len(required_checked)
-        remaining = len(required_unchecked)
-        optional = len(optional_tasks)
-
-        result = {
-            "has_remaining": remaining > 0,
-            "total": total,
-            "completed": completed,
-            "remaining": remaining,
-            "optional": optional
-        }
+        # 读取文档内容并统计任务
+        if stat.st_size > STREAM_THRESHOLD:
+            result = _check_remaining_tasks_streaming(doc_path)
+        else:
+            result = _check_remaining_tasks_bytes(_read_file_bytes(doc_path), use_cache)
 
         # 更新缓存
         _cache[doc_path] = result
@@ -195,19 +307,28 @@ def clear_cache(doc_path: str = None) -> None:
     else:
         _cache.clear()
         _cache_timestamps.clear()
+        _content_cache.clear()
+        _is_optional_section_header.cache_clear()
+        _get_header_level.cache_clear()
 
 
-def get_task_progress_summary(doc_path: str) -> str:
+def get_task_progress_summary(doc_path: Optional[str] = None, content: Optional[str] = None) -> str:
     """
     获取任务进度摘要字符串
 
     Args:
-        doc_path: markdown文档路径
+        doc_path: markdown文档路径（未提供 content 时使用）
+        content: 文档内容（可选），提供时直接解析，不再读取 doc_path
 
     Returns:
         str: 进度摘要，如 "3/10 completed (7 remaining, 5 optional excluded)"
     """
-    result = check_remaining_tasks(doc_path)
+    if content is not None:
+        result = check_remaining_tasks_content(content)
+    elif doc_path is not None:
+        result = check_remaining_tasks(doc_path)
+    else:
+        return "Error: 未提供文档路径或内容"
 
     if "error" in result:
         return f"Error: {result['error']}"